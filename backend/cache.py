@@ -0,0 +1,111 @@
+"""
+Per-table data versions and small in-process read caches.
+
+Every ORM flush and every bulk INSERT/UPDATE/DELETE executed through a Session
+bumps the version of the tables it wrote, once when the statement runs and once
+more when the transaction commits or rolls back. A value cached under a
+version can therefore never be served after a write to its tables has become
+visible. Writes made outside SQLAlchemy sessions (e.g. raw COPY) must call
+bump() themselves.
+
+The versions live in this process only; run a single API process (as the
+Dockerfile does) or the caches of one worker will not see another's writes.
+"""
+import threading
+import uuid
+from collections import OrderedDict
+from itertools import chain
+from typing import Any, Hashable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_versions: dict[str, int] = {}
+_versions_lock = threading.Lock()
+
+# Versions restart from 0 with the process; tags built from them carry this
+# so a tag handed out before a restart can't match a later one by accident
+BOOT_ID = uuid.uuid4().hex[:8]
+
+
+def bump(*tables: str) -> None:
+    with _versions_lock:
+        for table in tables:
+            _versions[table] = _versions.get(table, 0) + 1
+
+
+def version(*tables: str) -> Tuple[int, ...]:
+    with _versions_lock:
+        return tuple(_versions.get(table, 0) for table in tables)
+
+
+def etag(*tables: str) -> str:
+    """Weak HTTP entity tag that changes whenever any of tables is written."""
+    return f'W/"{BOOT_ID}-{".".join(str(v) for v in version(*tables))}"'
+
+
+def _written_tables(session: Session) -> set:
+    return session.info.setdefault("written_tables", set())
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_flushed_tables(session, flush_context):
+    # new/dirty/deleted still hold the pre-flush state here
+    tables = {
+        obj.__table__.name
+        for obj in chain(session.new, session.dirty, session.deleted)
+        if hasattr(obj, "__table__")
+    }
+    if tables:
+        _written_tables(session).update(tables)
+        bump(*tables)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _bump_bulk_statement_tables(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        name = getattr(table, "name", None)
+        if name:
+            _written_tables(session=orm_execute_state.session).add(name)
+            bump(name)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_soft_rollback")
+def _bump_on_transaction_end(session, *args):
+    # Readers may have cached values computed from the pre-commit snapshot
+    # under the version bumped at flush time; invalidate those too.
+    tables = session.info.pop("written_tables", None)
+    if tables:
+        bump(*tables)
+
+
+class VersionedCache:
+    """
+    Small LRU cache whose entries are only valid for the data version of the
+    tables they were computed from.
+    """
+
+    def __init__(self, tables: Tuple[str, ...], maxsize: int = 256):
+        self.tables = tables
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Tuple[Tuple[int, ...], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        current = version(*self.tables)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != current:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, at_version: Tuple[int, ...]) -> None:
+        """at_version must be read *before* computing value."""
+        with self._lock:
+            self._entries[key] = (at_version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
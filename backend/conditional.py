@@ -0,0 +1,42 @@
+"""
+Conditional GET (ETag / If-None-Match) for read endpoints.
+
+The tag is derived from the cache.py versions of the tables an endpoint reads,
+so checking it costs no query: while none of those tables has been written,
+a request carrying the previous tag is answered 304 Not Modified before the
+endpoint runs, skipping both its queries and the response serialization.
+"""
+from fastapi import Depends, HTTPException, Request, Response
+
+from . import cache
+
+
+def _matches(if_none_match: str, tag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/"x" and "x" are the same tag
+    opaque = tag[2:] if tag.startswith("W/") else tag
+    return any(
+        (candidate[2:] if candidate.startswith("W/") else candidate) == opaque
+        for candidate in (c.strip() for c in if_none_match.split(","))
+    )
+
+
+def versioned(*tables: str):
+    """
+    Route dependency: sets ETag on the response from the versions of tables
+    and returns 304 when the request's If-None-Match already has it. List
+    every table the endpoint's response is computed from.
+    """
+    def check(request: Request, response: Response) -> None:
+        # Read before the endpoint queries, so a write racing with them can
+        # only make the tag older than the body (a spurious refetch later),
+        # never newer
+        tag = cache.etag(*tables)
+        headers = {"ETag": tag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _matches(if_none_match, tag):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+
+    return Depends(check)
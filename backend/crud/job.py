@@ -0,0 +1,74 @@
+from datetime import datetime, timezone
+from typing import List, Optional
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from ..models import BackgroundJob
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def create_job(db: Session, kind: str, item_id: Optional[UUID] = None) -> BackgroundJob:
+    db_job = BackgroundJob(kind=kind, item_id=item_id, status="queued")
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+
+def get_job(db: Session, job_id: UUID) -> Optional[BackgroundJob]:
+    return db.query(BackgroundJob).filter(BackgroundJob.id == job_id).first()
+
+
+def get_active_job(db: Session, kind: str, item_id: Optional[UUID] = None) -> Optional[BackgroundJob]:
+    """Returns the queued/running job of this kind (and item), if any."""
+    return (
+        db.query(BackgroundJob)
+        .filter(
+            BackgroundJob.kind == kind,
+            BackgroundJob.item_id == item_id,
+            BackgroundJob.status.in_(ACTIVE_STATUSES),
+        )
+        .order_by(BackgroundJob.created_at.desc())
+        .first()
+    )
+
+
+def list_jobs(db: Session, item_id: Optional[UUID] = None, limit: int = 20) -> List[BackgroundJob]:
+    q = db.query(BackgroundJob)
+    if item_id is not None:
+        q = q.filter(BackgroundJob.item_id == item_id)
+    return q.order_by(BackgroundJob.created_at.desc()).limit(limit).all()
+
+
+def update_job(db: Session, job_id: UUID, **fields) -> Optional[BackgroundJob]:
+    db_job = get_job(db, job_id)
+    if db_job is None:
+        return None
+    for key, value in fields.items():
+        setattr(db_job, key, value)
+    db.add(db_job)
+    db.commit()
+    return db_job
+
+
+def fail_interrupted_jobs(db: Session) -> int:
+    """
+    Marks queued/running jobs left over from a previous process as failed.
+    The in-process worker pool does not survive a restart.
+    """
+    count = (
+        db.query(BackgroundJob)
+        .filter(BackgroundJob.status.in_(ACTIVE_STATUSES))
+        .update(
+            {
+                "status": "failed",
+                "error": "Interrupted by server restart",
+                "finished_at": datetime.now(timezone.utc),
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return count
@@ -1,15 +1,30 @@
+import json
+import queue
+import uuid
+import threading
 from datetime import datetime
 from decimal import Decimal
+from typing import Callable, Iterator, List, Optional
 from uuid import UUID
 from os import getenv
-import requests
 
+from plaid.exceptions import ApiException
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
-from .. import models
-from backend.security import encrypt_token
+from .. import models, plaid_client
+from backend.security import encrypt_token, decrypt_token
 from ..crud import transaction as crud_transaction
 
+# /transactions/sync page size (Plaid max is 500)
+PLAID_SYNC_PAGE_SIZE = 500
+# Pages the background fetcher may buffer ahead of the DB writer (0 = serial sync)
+PLAID_SYNC_PREFETCH_PAGES = int(getenv("PLAID_SYNC_PREFETCH_PAGES", "2"))
+# Restarts allowed per run on TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION
+PLAID_SYNC_MAX_RESTARTS = int(getenv("PLAID_SYNC_MAX_RESTARTS", "3"))
+
+_END_OF_PAGES = object()
 
 # --- PlaidItem CRUD ---
 
@@ -35,26 +50,33 @@ def get_plaid_item_by_id(db: Session, id: UUID) -> models.PlaidItem:
     return db.query(models.PlaidItem).filter(models.PlaidItem.id == id).first()
 
 
-def update_transactions_cursor(db: Session, plaid_item_id: str, new_cursor: str) -> models.PlaidItem:
-    db_item = get_plaid_item_by_plaid_item_id(db, plaid_item_id)
-    if db_item:
-        db_item.transactions_cursor = new_cursor
-        db.add(db_item)
-        db.commit()
-        db.refresh(db_item)
-    return db_item
+def list_plaid_items(db: Session) -> list[models.PlaidItem]:
+    return db.query(models.PlaidItem).all()
 
 
-# --- Accounts CRUD ---
+def checkpoint_transactions_cursor(db: Session, plaid_item_id: str, new_cursor: str) -> None:
+    """
+    Stores the item's cursor as part of the caller's transaction (no commit),
+    so it lands atomically with the rows of the page it belongs to.
+    """
+    db.execute(
+        update(models.PlaidItem)
+        .where(models.PlaidItem.plaid_item_id == plaid_item_id)
+        .values(transactions_cursor=new_cursor)
+    )
 
-def get_account_by_plaid_account_id(db: Session, plaid_account_id: str) -> models.Account:
-    return db.query(models.Account).filter(models.Account.plaid_account_id == plaid_account_id).first()
 
+# --- Accounts CRUD ---
 
 def list_accounts_by_item(db: Session, item_id: UUID) -> list[models.Account]:
     return db.query(models.Account).filter(models.Account.item_id == item_id).all()
 
 
+def build_account_map(db: Session, item_id: UUID) -> dict[str, UUID]:
+    """plaid_account_id -> Account.id for every account of one item."""
+    return {acct.plaid_account_id: acct.id for acct in list_accounts_by_item(db, item_id)}
+
+
 def create_account(db: Session, account: dict, item_id: UUID) -> models.Account:
     db_account = models.Account(
         item_id=item_id,
@@ -74,8 +96,12 @@ def sync_accounts_and_balances(db: Session, client, access_token: str, item_id:
     """
     FAST, safe to call often.
     - fetch /accounts/get
-    - upsert account rows
-    - update persisted balances + last_updated
+    - prefetch the matching account rows with one query
+    - upsert only new accounts and accounts whose identity or balances changed,
+      in one INSERT ... ON CONFLICT (plaid_account_id) DO UPDATE
+
+    Returns the number of account rows written. balance_last_updated is only
+    bumped on rows that were actually written.
     """
     # Plaid SDK request object
     from plaid.model.accounts_get_request import AccountsGetRequest
@@ -83,107 +109,235 @@ def sync_accounts_and_balances(db: Session, client, access_token: str, item_id:
     req = AccountsGetRequest(access_token=access_token)
     resp = client.accounts_get(req)
 
+    accounts = [acct.to_dict() for acct in resp.accounts]
+    if not accounts:
+        return 0
+
+    existing = {
+        row.plaid_account_id: row
+        for row in db.query(
+            models.Account.plaid_account_id,
+            models.Account.name,
+            models.Account.mask,
+            models.Account.type,
+            models.Account.subtype,
+            models.Account.current_balance,
+            models.Account.available_balance,
+            models.Account.currency,
+        )
+        .filter(models.Account.plaid_account_id.in_([data["account_id"] for data in accounts]))
+        .all()
+    }
+
     now = datetime.utcnow()
-    updated = 0
+    changed_rows = {}
 
-    for acct in resp.accounts:
-        data = acct.to_dict()
+    for data in accounts:
         balances = data.get("balances") or {}
+        current_row = existing.get(data["account_id"])
+        available = balances.get("available")
 
-        db_account = get_account_by_plaid_account_id(db, data["account_id"])
-
-        if db_account is None:
-            db_account = models.Account(
-                item_id=item_id,
-                plaid_account_id=data["account_id"],
-                name=data.get("name") or "Account",
-                mask=data.get("mask"),
-                type=data.get("type") or "unknown",
-                subtype=data.get("subtype"),
-                is_active=True,
-            )
-            db.add(db_account)
-
-        # identity fields
-        db_account.name = data.get("name") or db_account.name
-        db_account.mask = data.get("mask")
-        db_account.type = data.get("type") or db_account.type
-        db_account.subtype = data.get("subtype")
+        fields = {
+            # identity fields
+            "name": data.get("name") or (current_row.name if current_row else "Account"),
+            "mask": data.get("mask"),
+            "type": data.get("type") or (current_row.type if current_row else "unknown"),
+            "subtype": data.get("subtype"),
+            # balances
+            "current_balance": Decimal(str(balances.get("current") or 0)),
+            "available_balance": Decimal(str(available)) if available is not None else None,
+            "currency": balances.get("iso_currency_code") or "USD",
+        }
 
-        # balances
-        db_account.current_balance = Decimal(str(balances.get("current") or 0))
-        available = balances.get("available")
-        db_account.available_balance = Decimal(str(available)) if available is not None else None
-        db_account.currency = balances.get("iso_currency_code") or "USD"
-        db_account.balance_last_updated = now
+        if current_row is not None and all(getattr(current_row, key) == value for key, value in fields.items()):
+            continue  # nothing changed, skip the write
 
-        db.add(db_account)
-        updated += 1
+        changed_rows[data["account_id"]] = {
+            "id": uuid.uuid4(),  # only used if the row is new
+            "item_id": item_id,
+            "plaid_account_id": data["account_id"],
+            "is_active": True,
+            "balance_last_updated": now,
+            **fields,
+        }
 
-    db.flush()
-    return updated
+    if not changed_rows:
+        return 0
+
+    stmt = insert(models.Account).values(list(changed_rows.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.Account.plaid_account_id],
+        set_={
+            key: stmt.excluded[key]
+            for key in (
+                "name", "mask", "type", "subtype",
+                "current_balance", "available_balance", "currency", "balance_last_updated",
+            )
+        },
+    )
+    db.execute(stmt)
+    return len(changed_rows)
 
 
-def sync_transactions_from_plaid(db: Session, access_token: str, plaid_item_id: str, cursor: str) -> dict:
+def fetch_transactions_sync_page(access_token: str, cursor: Optional[str]) -> dict:
     """
-    Syncs transactions from Plaid using raw HTTP requests (requests lib)
-    to avoid SDK type validation issues with cursors.
+    Fetches a single /transactions/sync page with a raw JSON request over the
+    shared Plaid connection pool (avoids SDK type validation issues with cursors).
     """
-    PLAID_ENVIRONMENT = getenv("PLAID_ENVIRONMENT", "Sandbox")
-    PLAID_BASE_URLS = {
-        "Sandbox": "https://sandbox.plaid.com",
-        "Development": "https://development.plaid.com",
-        "Production": "https://production.plaid.com"
+    body = {
+        "access_token": access_token,
+        "count": PLAID_SYNC_PAGE_SIZE,
     }
-    PLAID_BASE = PLAID_BASE_URLS.get(PLAID_ENVIRONMENT, "https://sandbox.plaid.com")
+    if cursor:
+        body["cursor"] = cursor
 
-    headers = {
-        "Content-Type": "application/json",
-        "PLAID-CLIENT-ID": getenv("PLAID_CLIENT_ID"),
-        "PLAID-SECRET": getenv("PLAID_SECRET"),
-    }
+    return plaid_client.post("/transactions/sync", body)
 
-    added_count = 0
-    modified_count = 0
-    removed_count = 0
-    has_more = True
 
-    while has_more:
-        body = {
-            "access_token": access_token,
-            "count": 500  # Max per page
-        }
-        if cursor:
-            body["cursor"] = cursor
-
-        print(f"DEBUG: calling {PLAID_BASE}/transactions/sync with cursor='{cursor}'")
-        resp = requests.post(f"{PLAID_BASE}/transactions/sync", json=body, headers=headers, timeout=60)
-        resp.raise_for_status()
-
-        data = resp.json()
-
-        added = data["added"]
-        modified = data["modified"]
-        removed = data["removed"]
-
-        has_more = data["has_more"]
-        cursor = data["next_cursor"]
+def iter_transactions_sync_pages(
+        access_token: str,
+        cursor: Optional[str],
+        prefetch_pages: int = PLAID_SYNC_PREFETCH_PAGES,
+) -> Iterator[dict]:
+    """
+    Yields /transactions/sync pages in cursor order until has_more is false.
 
-        for tx_data in added:
-            crud_transaction.create_or_update_transaction(db, tx_data)
-            added_count += 1
+    With prefetch_pages > 0 a background fetcher thread keeps pulling pages into a
+    bounded queue while the caller is still writing the previous one, so network
+    and database time overlap. At most prefetch_pages pages wait in the queue.
+    With prefetch_pages == 0 pages are fetched serially on the calling thread.
+    """
+    if prefetch_pages <= 0:
+        has_more = True
+        while has_more:
+            page = fetch_transactions_sync_page(access_token, cursor)
+            has_more = page["has_more"]
+            cursor = page["next_cursor"]
+            yield page
+        return
+
+    pages: queue.Queue = queue.Queue(maxsize=prefetch_pages)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        # Block while the queue is full, but give up once the consumer has gone away
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fetch():
+        next_cursor = cursor
+        has_more = True
+        try:
+            while has_more and not stop.is_set():
+                page = fetch_transactions_sync_page(access_token, next_cursor)
+                has_more = page["has_more"]
+                next_cursor = page["next_cursor"]
+                if not put(page):
+                    return
+        except Exception as e:
+            # Hand the error to the consumer so it is raised on the calling thread
+            put(e)
+            return
+        put(_END_OF_PAGES)
+
+    fetcher = threading.Thread(target=fetch, name="plaid-sync-fetcher", daemon=True)
+    fetcher.start()
+
+    try:
+        while True:
+            item = pages.get()
+            if item is _END_OF_PAGES:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def sync_transactions_from_plaid(
+        db: Session,
+        access_token: str,
+        plaid_item_id: str,
+        cursor: str,
+        prefetch_pages: int = PLAID_SYNC_PREFETCH_PAGES,
+        on_page: Optional[Callable[[int, int, str], None]] = None,
+        account_map: Optional[dict[str, UUID]] = None,
+        refresh_accounts: Optional[Callable[[], dict[str, UUID]]] = None,
+) -> dict:
+    """
+    Syncs transactions from Plaid page by page.
+
+    Pages are produced by iter_transactions_sync_pages (pipelined unless
+    prefetch_pages == 0). Each page's rows and its next_cursor are committed
+    together, so a failed run resumes from the last applied page, and a
+    TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION error restarts from that
+    saved cursor instead of from the beginning.
+    on_page, if given, is called after every committed page with
+    (pages_fetched, rows_applied, next_cursor) so callers can report progress.
+
+    account_map (plaid_account_id -> Account.id) is built once per run, from the
+    item's accounts unless the caller passes one. refresh_accounts is called at
+    most once per run, the first time a page references an unknown account.
+    """
+    if account_map is None:
+        db_item = get_plaid_item_by_plaid_item_id(db, plaid_item_id)
+        account_map = build_account_map(db, db_item.id)
+        if refresh_accounts is None:
+            refresh_accounts = lambda: build_account_map(db, db_item.id)
 
-        for tx_data in modified:
-            crud_transaction.create_or_update_transaction(db, tx_data)
-            modified_count += 1
+    refreshed = False
 
-        for tx_data in removed:
-            # 'removed' usually contains dicts with 'transaction_id'
-            crud_transaction.delete_transaction_by_plaid_id(db, tx_data["transaction_id"])
-            removed_count += 1
+    def refresh_once() -> dict[str, UUID]:
+        nonlocal refreshed
+        if refreshed or refresh_accounts is None:
+            return {}
+        refreshed = True
+        return refresh_accounts()
 
-    update_transactions_cursor(db, plaid_item_id, cursor)
-    db.commit()
+    added_count = 0
+    modified_count = 0
+    removed_count = 0
+    pages_fetched = 0
+    restarts = 0
+
+    while True:
+        try:
+            for data in iter_transactions_sync_pages(access_token, cursor, prefetch_pages):
+                added = data["added"]
+                modified = data["modified"]
+                removed = data["removed"]
+
+                next_cursor = data["next_cursor"]
+
+                # One INSERT ... ON CONFLICT for added + modified, one DELETE for removed,
+                # and the page's next_cursor, all committed together as a checkpoint.
+                crud_transaction.bulk_upsert_plaid_transactions(db, added + modified, account_map, refresh_once)
+                # 'removed' usually contains dicts with 'transaction_id'
+                crud_transaction.bulk_delete_transactions_by_plaid_ids(db, [tx["transaction_id"] for tx in removed])
+                checkpoint_transactions_cursor(db, plaid_item_id, next_cursor)
+                db.commit()
+
+                cursor = next_cursor
+                added_count += len(added)
+                modified_count += len(modified)
+                removed_count += len(removed)
+                pages_fetched += 1
+
+                if on_page is not None:
+                    on_page(pages_fetched, added_count + modified_count + removed_count, cursor)
+            break
+        except ApiException as e:
+            if plaid_error_code(e) != "TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION" or restarts >= PLAID_SYNC_MAX_RESTARTS:
+                raise
+            # Data changed under us mid-pagination: pick up again from the last saved checkpoint
+            db.rollback()
+            restarts += 1
 
     return {
         "message": "Sync successful",
@@ -192,3 +346,62 @@ def sync_transactions_from_plaid(db: Session, access_token: str, plaid_item_id:
         "removed": removed_count,
         "next_cursor": cursor,
     }
+
+
+# --- Item-level orchestration ---
+
+def sync_item(
+        db: Session,
+        client,
+        plaid_item: models.PlaidItem,
+        on_page: Optional[Callable[[int, int, str], None]] = None,
+) -> dict:
+    """
+    Full sync of one PlaidItem: refresh balances first, then pull transactions
+    from the item's stored cursor.
+    """
+    access_token = decrypt_token(plaid_item.plaid_access_token_encrypted)
+
+    accounts_updated = sync_accounts_and_balances(
+        db=db,
+        client=client,
+        access_token=access_token,
+        item_id=plaid_item.id,
+    )
+    db.commit()
+
+    def refresh_accounts() -> dict[str, UUID]:
+        # An account appeared after the balance refresh (e.g. newly shared by the bank)
+        sync_accounts_and_balances(db=db, client=client, access_token=access_token, item_id=plaid_item.id)
+        db.commit()
+        return build_account_map(db, plaid_item.id)
+
+    result = sync_transactions_from_plaid(
+        db=db,
+        access_token=access_token,
+        plaid_item_id=plaid_item.plaid_item_id,
+        cursor=plaid_item.transactions_cursor,
+        on_page=on_page,
+        account_map=build_account_map(db, plaid_item.id),
+        refresh_accounts=refresh_accounts,
+    )
+    result["accounts_updated"] = accounts_updated
+    return result
+
+
+def plaid_error_code(e: ApiException) -> Optional[str]:
+    """Extracts Plaid's error_code from an ApiException body, if present."""
+    try:
+        return json.loads(e.body).get("error_code")
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def describe_sync_error(e: Exception) -> str:
+    """Best-effort readable message for a failed Plaid sync."""
+    body = getattr(e, "body", None)  # plaid.exceptions.ApiException
+    if body:
+        if isinstance(body, bytes):
+            body = body.decode("utf-8", errors="replace")
+        return f"Plaid Sync Error: {body}"
+    return str(e)
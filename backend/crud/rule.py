@@ -0,0 +1,95 @@
+from typing import List, Optional
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from .. import cache
+from ..models import CategoryRule
+from ..rules import CompiledRule, RuleMatcher
+from ..schemas import CategoryRuleCreate, CategoryRuleUpdate
+
+# The compiled matcher for the current set of active rules
+# (categories too: deleting a category cascades to its rules inside Postgres)
+_matcher_cache = cache.VersionedCache(tables=("category_rules", "categories"), maxsize=1)
+
+
+def get_rule(db: Session, rule_id: UUID) -> Optional[CategoryRule]:
+    return db.query(CategoryRule).filter(CategoryRule.id == rule_id).first()
+
+
+def list_rules(db: Session) -> List[CategoryRule]:
+    return db.query(CategoryRule).order_by(CategoryRule.priority, CategoryRule.created_at).all()
+
+
+def create_rule(db: Session, new_rule: CategoryRuleCreate) -> CategoryRule:
+    db_rule = CategoryRule(**new_rule.model_dump())
+    db.add(db_rule)
+    db.commit()
+    db.refresh(db_rule)
+    return db_rule
+
+
+def update_rule(db: Session, rule_id: UUID, update_data: CategoryRuleUpdate) -> Optional[CategoryRule]:
+    db_rule = get_rule(db, rule_id)
+    if not db_rule:
+        return None
+
+    for key, value in update_data.model_dump(exclude_unset=True).items():
+        setattr(db_rule, key, value)
+
+    db.add(db_rule)
+    db.commit()
+    db.refresh(db_rule)
+    return db_rule
+
+
+def delete_rule(db: Session, rule_id: UUID) -> Optional[CategoryRule]:
+    db_rule = get_rule(db, rule_id)
+    if not db_rule:
+        return None
+
+    db.delete(db_rule)
+    db.commit()
+    return db_rule
+
+
+def get_rule_matcher(db: Session) -> RuleMatcher:
+    """
+    RuleMatcher over all active rules, compiled once and reused until a rule
+    changes.
+    """
+    matcher = _matcher_cache.get("active")
+    if matcher is not None:
+        return matcher
+
+    at_version = cache.version(*_matcher_cache.tables)
+    rows = (
+        db.query(
+            CategoryRule.id,
+            CategoryRule.pattern,
+            CategoryRule.category_id,
+            CategoryRule.priority,
+            CategoryRule.account_id,
+            CategoryRule.min_amount,
+            CategoryRule.max_amount,
+        )
+        .filter(CategoryRule.is_active == True)
+        .order_by(CategoryRule.priority, CategoryRule.created_at, CategoryRule.id)
+        .all()
+    )
+    matcher = RuleMatcher(
+        (
+            row.pattern,
+            CompiledRule(
+                rule_id=row.id,
+                category_id=row.category_id,
+                priority=row.priority,
+                account_id=row.account_id,
+                min_amount=row.min_amount,
+                max_amount=row.max_amount,
+            ),
+        )
+        for row in rows
+    )
+    _matcher_cache.set("active", matcher, at_version)
+    return matcher
@@ -0,0 +1,283 @@
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import and_, case, cast, extract, func, literal, literal_column, select, text, true, union_all
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import Session
+from sqlalchemy.types import DATE, DECIMAL, Integer
+
+from .. import cache
+from ..models import Budget, Category, CategoryGroup, CategoryMonthTotal
+
+ZERO = Decimal("0.00")
+
+# Full recomputation of category_month_totals from transactions. The triggers
+# installed by migrations.py apply the same grouping as deltas.
+CATEGORY_MONTH_TOTALS_SELECT = """
+    SELECT category_id, CAST(date_trunc('month', date) AS date) AS month,
+           SUM(amount) AS total, COUNT(*) AS transaction_count
+    FROM transactions
+    WHERE category_id IS NOT NULL
+    GROUP BY 1, 2
+"""
+
+
+def rebuild_category_month_totals(db: Session) -> Dict[str, int]:
+    """
+    Regenerates category_month_totals from scratch in one transaction.
+    Writes to transactions wait for it to finish, so no trigger delta lands
+    on a half-built table or is counted twice.
+    """
+    db.execute(text("LOCK TABLE transactions IN SHARE MODE"))
+    db.execute(text("TRUNCATE category_month_totals"))
+    rows = db.execute(text(
+        "INSERT INTO category_month_totals (category_id, month, total, transaction_count) "
+        + CATEGORY_MONTH_TOTALS_SELECT
+    )).rowcount
+    db.commit()
+    cache.bump("category_month_totals")
+    return {"rows": rows}
+
+
+def _amount(value) -> Any:
+    # Keeps the two decimal places of the amount columns on coalesced / summed values
+    return cast(value, DECIMAL(14, 2))
+
+
+# Trailing windows reported by get_month_summary(with_history=True)
+AVERAGE_WINDOWS = (3, 6, 12)
+
+
+def _history_subquery(month_start: date):
+    """
+    One row per category with its trailing averages, year-to-date sums and
+    same-month-last-year actual as of month_start, in Transaction.amount's
+    sign. Window functions run over the monthly aggregates (and budgets) of
+    the 13 months up to month_start. Frames are RANGEs over a month number,
+    so months without a row count as 0 without having to fill them in.
+    """
+    first_month = date(month_start.year - 1, month_start.month, 1)
+    zero = _amount(literal(0))
+    monthly = union_all(
+        select(
+            CategoryMonthTotal.category_id,
+            CategoryMonthTotal.month,
+            _amount(CategoryMonthTotal.total).label("actual"),
+            zero.label("planned"),
+        ).where(CategoryMonthTotal.month.between(first_month, month_start)),
+        select(Budget.category_id, Budget.budget_month, zero, _amount(Budget.planned_amount))
+        .where(Budget.budget_month.between(first_month, month_start), Budget.category_id.isnot(None)),
+        # Every category gets a row for month_start to hang its windows on
+        select(Category.category_id, cast(literal(month_start), DATE), zero, zero),
+    ).subquery("monthly")
+    by_month = (
+        select(
+            monthly.c.category_id,
+            monthly.c.month,
+            cast(extract("year", monthly.c.month) * 12 + extract("month", monthly.c.month), Integer).label("n"),
+            func.sum(monthly.c.actual).label("actual"),
+            func.sum(monthly.c.planned).label("planned"),
+        )
+        .group_by(monthly.c.category_id, monthly.c.month)
+        .subquery("by_month")
+    )
+
+    by_category = {"partition_by": by_month.c.category_id, "order_by": by_month.c.n}
+    by_year = {
+        "partition_by": (by_month.c.category_id, extract("year", by_month.c.month)),
+        "order_by": by_month.c.n,
+        "range_": (None, 0),
+    }
+    windows = select(
+        by_month.c.category_id,
+        by_month.c.month,
+        *[
+            (func.sum(by_month.c.actual).over(range_=(1 - months, 0), **by_category) / months).label(f"avg_{months}")
+            for months in AVERAGE_WINDOWS
+        ],
+        func.sum(by_month.c.actual).over(**by_year).label("ytd_actual"),
+        func.sum(by_month.c.planned).over(**by_year).label("ytd_planned"),
+        # NULL when there is no row for that month at all
+        func.sum(by_month.c.actual).over(range_=(-12, -12), **by_category).label("last_year_actual"),
+    ).subquery("windows")
+    return select(windows).where(windows.c.month == month_start).subquery("history")
+
+
+def get_month_summary(db: Session, month_start: date, with_history: bool = False) -> Dict[str, Any]:
+    """
+    Planned vs. actual for one month, per category and rolled up per group
+    and into income / expense totals, from a single statement.
+
+    Amounts follow the budget's view rather than Transaction.amount's sign:
+    income actuals are inflows shown as positive. Transfers count towards
+    their group but not the income / expense totals.
+
+    Returns {"groups": [{group_id, name, categories: [{category_id, name,
+    type, planned, actual, remaining, is_over_budget}], total_planned,
+    total_actual, total_remaining}], "income_planned", "income_actual",
+    "expense_planned", "expense_actual"}, groups and categories in sort_order.
+
+    with_history=True adds, per category and in the same statement: the
+    average actual of the 3, 6 and 12 months ending with this one
+    (avg_actual_3m, ...), ytd_planned / ytd_actual from January through this
+    month, last_year_actual for the same month a year earlier and
+    change_vs_last_year (None when there is no data for that month).
+    """
+    planned = _amount(func.coalesce(Budget.planned_amount, 0))
+    raw_actual = _amount(func.coalesce(CategoryMonthTotal.total, 0))
+    actual = case((Category.type == "income", -raw_actual), else_=raw_actual)
+    remaining = planned - actual
+
+    def by_type(category_type: str, value):
+        return _amount(func.sum(case((Category.type == category_type, value), else_=literal(0))).over())
+
+    def signed(value):
+        return _amount(case((Category.type == "income", -value), else_=value))
+
+    history_columns = []
+    if with_history:
+        history = _history_subquery(month_start)
+        last_year = signed(history.c.last_year_actual)
+        history_columns = [
+            *[signed(history.c[f"avg_{months}"]).label(f"avg_actual_{months}m") for months in AVERAGE_WINDOWS],
+            _amount(history.c.ytd_planned).label("ytd_planned"),
+            signed(history.c.ytd_actual).label("ytd_actual"),
+            last_year.label("last_year_actual"),
+            (actual - last_year).label("change_vs_last_year"),
+        ]
+
+    by_group = {"partition_by": CategoryGroup.category_group_id}
+    query = (
+        db.query(
+            CategoryGroup.category_group_id.label("group_id"),
+            CategoryGroup.name.label("group_name"),
+            Category.category_id,
+            Category.name,
+            Category.type,
+            planned.label("planned"),
+            actual.label("actual"),
+            remaining.label("remaining"),
+            # income doesn't go "over budget" in the same way
+            and_(Category.type != "income", remaining < 0).label("is_over_budget"),
+            _amount(func.sum(planned).over(**by_group)).label("group_planned"),
+            _amount(func.sum(actual).over(**by_group)).label("group_actual"),
+            _amount(func.sum(remaining).over(**by_group)).label("group_remaining"),
+            by_type("income", planned).label("income_planned"),
+            by_type("income", actual).label("income_actual"),
+            by_type("expense", planned).label("expense_planned"),
+            by_type("expense", actual).label("expense_actual"),
+            *history_columns,
+        )
+        .outerjoin(Category, Category.group_id == CategoryGroup.category_group_id)
+        .outerjoin(Budget, and_(Budget.category_id == Category.category_id, Budget.budget_month == month_start))
+        .outerjoin(
+            CategoryMonthTotal,
+            and_(CategoryMonthTotal.category_id == Category.category_id, CategoryMonthTotal.month == month_start),
+        )
+    )
+    if with_history:
+        query = query.outerjoin(history, history.c.category_id == Category.category_id)
+    rows = query.order_by(CategoryGroup.sort_order, CategoryGroup.name, Category.sort_order, Category.name).all()
+
+    summary: Dict[str, Any] = {
+        "groups": [],
+        "income_planned": rows[0].income_planned if rows else ZERO,
+        "income_actual": rows[0].income_actual if rows else ZERO,
+        "expense_planned": rows[0].expense_planned if rows else ZERO,
+        "expense_actual": rows[0].expense_actual if rows else ZERO,
+    }
+    groups: List[Dict[str, Any]] = summary["groups"]
+    for row in rows:
+        if not groups or groups[-1]["group_id"] != row.group_id:
+            groups.append({
+                "group_id": row.group_id,
+                "name": row.group_name,
+                "categories": [],
+                "total_planned": row.group_planned,
+                "total_actual": row.group_actual,
+                "total_remaining": row.group_remaining,
+            })
+        if row.category_id is None:
+            continue  # group without categories
+        groups[-1]["categories"].append({
+            "category_id": row.category_id,
+            "name": row.name,
+            "type": row.type,
+            "planned": row.planned,
+            "actual": row.actual,
+            "remaining": row.remaining,
+            "is_over_budget": row.is_over_budget,
+            **{column.name: getattr(row, column.name) for column in history_columns},
+        })
+    return summary
+
+
+def month_starts(start_month: date, end_month: date) -> List[date]:
+    """First days of the months from start_month to end_month, inclusive."""
+    months = []
+    year, month = start_month.year, start_month.month
+    while (year, month) <= (end_month.year, end_month.month):
+        months.append(date(year, month, 1))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def get_trend(
+        db: Session,
+        start_month: date,
+        end_month: date,
+        group_id: Optional[UUID] = None,
+        category_id: Optional[UUID] = None,
+) -> Dict[str, Any]:
+    """
+    Planned vs. actual per category for every month from start_month to
+    end_month (first days, inclusive), in one statement: the month series
+    crossed with the categories, joined to budgets and category_month_totals.
+    Months without a budget or transactions come back as 0.00, so every
+    series has one entry per month. Signs as in get_month_summary.
+
+    Returns {"months": [date, ...], "categories": [{category_id, group_id,
+    name, type, planned: [...], actual: [...]}]}, in sort_order; the
+    per-month values are collected into arrays by the query itself.
+    """
+    series = func.generate_series(
+        cast(start_month, DATE), cast(end_month, DATE), literal_column("interval '1 month'")
+    ).table_valued("month").render_derived(name="months")
+    month = cast(series.c.month, DATE)
+
+    planned = _amount(func.coalesce(Budget.planned_amount, 0))
+    raw_actual = _amount(func.coalesce(CategoryMonthTotal.total, 0))
+    actual = case((Category.type == "income", -raw_actual), else_=raw_actual)
+
+    # One row per category, its months aggregated in order
+    query = (
+        db.query(
+            Category.category_id,
+            Category.group_id,
+            Category.name,
+            Category.type,
+            func.array_agg(aggregate_order_by(planned, series.c.month)).label("planned"),
+            func.array_agg(aggregate_order_by(actual, series.c.month)).label("actual"),
+        )
+        .join(CategoryGroup, CategoryGroup.category_group_id == Category.group_id)
+        .join(series, true())
+        .outerjoin(Budget, and_(Budget.category_id == Category.category_id, Budget.budget_month == month))
+        .outerjoin(
+            CategoryMonthTotal,
+            and_(CategoryMonthTotal.category_id == Category.category_id, CategoryMonthTotal.month == month),
+        )
+    )
+    if group_id is not None:
+        query = query.filter(Category.group_id == group_id)
+    if category_id is not None:
+        query = query.filter(Category.category_id == category_id)
+    rows = (
+        query.group_by(CategoryGroup.category_group_id, Category.category_id)
+        .order_by(CategoryGroup.sort_order, CategoryGroup.name, Category.sort_order, Category.name)
+        .all()
+    )
+
+    categories = [row._asdict() for row in rows]
+    return {"months": month_starts(start_month, end_month), "categories": categories}
@@ -1,11 +1,105 @@
-from typing import List, Optional, Dict, Any
+import base64
+import binascii
+import csv
+import hashlib
+import io
+import uuid
+from collections import Counter
+from typing import Callable, Iterator, List, Optional, Dict, Any, Sequence, Tuple
 from uuid import UUID
+from sqlalchemy import delete, update, any_, bindparam, tuple_, or_, func, text, select, cast, Table, MetaData, Column
+from sqlalchemy.dialects.postgresql import insert, ARRAY
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.types import Date, String, Text, Uuid
 from datetime import date
 
-from ..models import Transaction
+from .. import cache
+from ..merchants import stored_merchant_key
+from ..models import Account, Category, Transaction
+from pydantic import ValidationError
+
 from ..schemas import TransactionCreate
-from .plaid import get_account_by_plaid_account_id  # <-- Import this helper
+from . import rule as crud_rule
+
+# Rows fetched per server-side cursor round trip by iter_transaction_export_rows
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = (
+    Transaction.transaction_id,
+    Transaction.date,
+    Transaction.description,
+    Transaction.merchant_key,
+    Transaction.amount,
+    Transaction.pending,
+    Account.name.label("account"),
+    Category.name.label("category"),
+    Transaction.account_id,
+    Transaction.category_id,
+    Transaction.plaid_transaction_id,
+)
+EXPORT_FIELDS = tuple(c.key for c in EXPORT_COLUMNS)
+
+# Transactions read and re-categorized per commit by apply_rules_to_transactions
+RULES_BATCH_SIZE = 2000
+# Transactions keyed per commit by backfill_merchant_keys
+MERCHANT_BATCH_SIZE = 5000
+
+# Rows buffered per COPY round trip by import_transactions
+IMPORT_BATCH_SIZE = 5000
+# Row errors reported back per import; the rest are only counted
+IMPORT_MAX_ERRORS = 1000
+
+
+def _as_text(column):
+    """
+    Projection of a column in its JSON text form, converted by Postgres: much
+    cheaper than building UUID / Decimal / date objects in Python only to turn
+    them back into strings.
+    """
+    if isinstance(column.type, Date):
+        return func.to_char(column, "YYYY-MM-DD").label(column.key)
+    return cast(column, Text).label(column.key)
+
+
+# list_transaction(as_rows=True): the TransactionRead fields, and its nested
+# AccountRead fields (Account.id is exposed as account_id)
+LIST_COLUMNS = (
+    _as_text(Transaction.transaction_id),
+    Transaction.plaid_transaction_id,
+    _as_text(Transaction.account_id),
+    _as_text(Transaction.category_id),
+    Transaction.description,
+    Transaction.merchant_key,
+    _as_text(Transaction.amount),
+    _as_text(Transaction.date),
+    Transaction.datetime,
+    Transaction.pending,
+)
+LIST_ACCOUNT_COLUMNS = (
+    _as_text(Account.id),
+    Account.plaid_account_id,
+    _as_text(Account.item_id),
+    Account.name,
+    Account.mask,
+    Account.type,
+    Account.subtype,
+    _as_text(Account.current_balance),
+    _as_text(Account.available_balance),
+    Account.currency,
+    Account.balance_last_updated,
+    Account.is_active,
+)
+_LIST_KEYS = tuple(c.key for c in LIST_COLUMNS)
+_LIST_ACCOUNT_KEYS = ("account_id",) + tuple(c.key for c in LIST_ACCOUNT_COLUMNS[1:])
+
+# Planner estimates at or above this are returned as-is for total=estimate
+ESTIMATE_MIN_ROWS = 10000
+
+# Normalized filter tuple -> exact COUNT(*), invalidated by any transactions write
+_count_cache = cache.VersionedCache(tables=("transactions",))
+
+# Whether pg_trgm is installed (see migrations.py); checked once per process
+_trigram_enabled: Optional[bool] = None
 
 
 def get_transaction(db: Session, transaction_id: UUID) -> Optional[Transaction]:
@@ -19,23 +113,69 @@ def get_transaction_by_plaid_id(db: Session, plaid_transaction_id: str) -> Optio
     return db.query(Transaction).options(joinedload(Transaction.account)).filter(Transaction.plaid_transaction_id == plaid_transaction_id).first()
 
 
-def list_transaction(
-        db: Session,
+def encode_transaction_cursor(tx_date: date, transaction_id: UUID) -> str:
+    """Opaque keyset cursor for the (date desc, transaction_id desc) sort key."""
+    raw = f"{tx_date.isoformat()}|{transaction_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_transaction_cursor(cursor: str) -> Tuple[date, UUID]:
+    """Raises ValueError on a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        tx_date, transaction_id = raw.split("|", 1)
+        return date.fromisoformat(tx_date), UUID(transaction_id)
+    except (UnicodeDecodeError, binascii.Error, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def trigram_search_enabled(db: Session) -> bool:
+    global _trigram_enabled
+    if _trigram_enabled is None:
+        _trigram_enabled = db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first() is not None
+    return _trigram_enabled
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def description_search_condition(db: Session, q: str, fuzzy: bool = True):
+    """
+    Case-insensitive substring match on description, plus a fuzzy word match
+    ("amzn mktplace" finds "AMZN Mktp US*...") when pg_trgm is installed and
+    fuzzy is set. Both halves are served by the trigram GIN index on description.
+    """
+    term = q.strip()
+    condition = Transaction.description.ilike(f"%{_escape_like(term)}%", escape="\\")
+    if fuzzy and trigram_search_enabled(db):
+        condition = or_(condition, Transaction.description.op("%>")(term))
+    return condition
+
+
+def description_relevance(db: Session, q: str):
+    """Sort key for sort=relevance, higher is better."""
+    term = q.strip()
+    if trigram_search_enabled(db):
+        return func.word_similarity(term, Transaction.description)
+    # Without pg_trgm: earlier matches rank first
+    return -func.strpos(func.lower(Transaction.description), term.lower())
+
+
+def apply_transaction_filters(
+        query,
         account_id: Optional[UUID] = None,
         category_id: Optional[UUID] = None,
         start_date: Optional[date] = None,
         end_date: Optional[date] = None,
         uncategorized: Optional[bool] = None,
         q: Optional[str] = None,
-        limit: int = 50,
-        offset: int = 0
-) -> Dict[str, Any]:
+        fuzzy: bool = True,
+):
     """
-    Lists transactions with optional filters for account, category,
-    search text, and a date range. Supports pagination.
+    Applies the list_transaction filters to any query over Transaction.
+    fuzzy=False restricts q to the exact substring match.
     """
-    query = db.query(Transaction).options(joinedload(Transaction.account))
-
     if account_id is not None:
         query = query.filter(Transaction.account_id == account_id)
     if category_id is not None:
@@ -44,33 +184,388 @@ def list_transaction(
         query = query.filter(Transaction.date >= start_date)
     if end_date is not None:
         query = query.filter(Transaction.date <= end_date)
-    
+
     # New filters
     if uncategorized is True:
         query = query.filter(Transaction.category_id == None)
-    if q:
-        # Case-insensitive search on description
-        query = query.filter(Transaction.description.ilike(f"%{q}%"))
+    if q and q.strip():
+        query = query.filter(description_search_condition(query.session, q, fuzzy=fuzzy))
+
+    return query
+
+
+def count_transactions(
+        db: Session,
+        account_id: Optional[UUID] = None,
+        category_id: Optional[UUID] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        uncategorized: Optional[bool] = None,
+        q: Optional[str] = None,
+        mode: str = "exact",
+) -> Tuple[Optional[int], bool]:
+    """
+    Total number of transactions matching the filters, as (total, is_estimate).
 
-    # Get total count before pagination
+    - exact: COUNT(*), cached per normalized filter set until transactions change
+    - estimate: the cached exact count if there is one, otherwise the planner's
+      row estimate when it is above ESTIMATE_MIN_ROWS (large, mostly unfiltered
+      ranges), otherwise an exact count
+    - none: skip counting, total is None
+    """
+    if mode == "none":
+        return None, False
+
+    key = (
+        account_id,
+        category_id,
+        start_date,
+        end_date,
+        uncategorized is True,
+        q.strip().lower() if q and q.strip() else None,  # search is case-insensitive
+    )
+    cached = _count_cache.get(key)
+    if cached is not None:
+        return cached, False
+
+    query = apply_transaction_filters(
+        db.query(Transaction.transaction_id),
+        account_id=account_id,
+        category_id=category_id,
+        start_date=start_date,
+        end_date=end_date,
+        uncategorized=uncategorized,
+        q=q,
+    )
+
+    if mode == "estimate":
+        estimate = _planner_row_estimate(db, query)
+        if estimate >= ESTIMATE_MIN_ROWS:
+            return estimate, True
+
+    at_version = cache.version(*_count_cache.tables)
     total = query.count()
+    _count_cache.set(key, total, at_version)
+    return total, False
+
+
+def _planner_row_estimate(db: Session, query) -> int:
+    """Row estimate from EXPLAIN for a query, without executing it."""
+    compiled = query.statement.compile(dialect=db.get_bind().dialect)
+    plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def list_transaction(
+        db: Session,
+        account_id: Optional[UUID] = None,
+        category_id: Optional[UUID] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        uncategorized: Optional[bool] = None,
+        q: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        total_mode: str = "exact",
+        sort: str = "date",
+        as_rows: bool = False,
+) -> Dict[str, Any]:
+    """
+    Lists transactions with optional filters for account, category,
+    search text, and a date range. Supports pagination.
+
+    total_mode controls the `total` field, see count_transactions.
+
+    sort="relevance" ranks search matches (`q`) best-first, ties newest first;
+    it pages with offset only.
+
+    as_rows=True selects only the LIST_COLUMNS / LIST_ACCOUNT_COLUMNS and
+    returns items as plain dicts shaped like TransactionRead, with ids, amounts
+    and dates already as JSON strings, skipping ORM object hydration; the list
+    endpoint serializes them directly.
+
+    Pass the previous page's next_cursor as `cursor` to seek directly past it
+    on (date, transaction_id) instead of using OFFSET; deep pages then cost the
+    same as the first one. `offset` is ignored when a cursor is given.
+    """
+    if as_rows:
+        query = db.query(*LIST_COLUMNS, *LIST_ACCOUNT_COLUMNS).outerjoin(Account, Transaction.account_id == Account.id)
+    else:
+        query = db.query(Transaction).options(joinedload(Transaction.account))
+    query = apply_transaction_filters(
+        query,
+        account_id=account_id,
+        category_id=category_id,
+        start_date=start_date,
+        end_date=end_date,
+        uncategorized=uncategorized,
+        q=q,
+    )
+
+    total, total_is_estimate = count_transactions(
+        db,
+        account_id=account_id,
+        category_id=category_id,
+        start_date=start_date,
+        end_date=end_date,
+        uncategorized=uncategorized,
+        q=q,
+        mode=total_mode,
+    )
+
+    ranked = sort == "relevance" and q and q.strip()
+    if ranked and cursor:
+        raise ValueError("cursor pagination is only supported with sort=date")
 
     # Sorting: Date DESC, then Transaction ID DESC (stable sort)
+    if ranked:
+        query = query.order_by(description_relevance(db, q).desc())
     query = query.order_by(Transaction.date.desc(), Transaction.transaction_id.desc())
 
     # Pagination
-    query = query.offset(offset).limit(limit)
+    if cursor:
+        after_date, after_id = decode_transaction_cursor(cursor)
+        query = query.filter(tuple_(Transaction.date, Transaction.transaction_id) < tuple_(after_date, after_id))
+        offset = 0
+    else:
+        query = query.offset(offset)
 
-    items = query.all()
+    # Fetch one extra row to know whether another page exists
+    items = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        if items and not ranked and as_rows:  # limit=0 leaves no last row to continue from
+            next_cursor = encode_transaction_cursor(date.fromisoformat(items[-1].date), UUID(items[-1].transaction_id))
+        elif items and not ranked:
+            next_cursor = encode_transaction_cursor(items[-1].date, items[-1].transaction_id)
+
+    if as_rows:
+        items = [_list_row_to_dict(row) for row in items]
 
     return {
         "items": items,
         "total": total,
+        "total_is_estimate": total_is_estimate,
         "limit": limit,
-        "offset": offset
+        "offset": offset,
+        "next_cursor": next_cursor,
     }
 
 
+def iter_transaction_export_rows(
+        db: Session,
+        account_id: Optional[UUID] = None,
+        category_id: Optional[UUID] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        uncategorized: Optional[bool] = None,
+        q: Optional[str] = None,
+        batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[Sequence[Any]]:
+    """
+    Yields batches of plain rows (no ORM objects) for every transaction
+    matching the list_transaction filters, newest first, with account and
+    category names. Rows are streamed from a server-side cursor, so memory
+    stays at one batch regardless of the result size.
+    """
+    query = apply_transaction_filters(
+        db.query(*EXPORT_COLUMNS)
+        .outerjoin(Account, Transaction.account_id == Account.id)
+        .outerjoin(Category, Transaction.category_id == Category.category_id),
+        account_id=account_id,
+        category_id=category_id,
+        start_date=start_date,
+        end_date=end_date,
+        uncategorized=uncategorized,
+        q=q,
+    ).order_by(Transaction.date.desc(), Transaction.transaction_id.desc())
+
+    result = db.execute(query.statement.execution_options(yield_per=batch_size))
+    yield from result.partitions()
+
+
+def bulk_update_transactions(
+        db: Session,
+        payload,
+        transaction_ids: Optional[List[UUID]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+) -> int:
+    """
+    Applies a TransactionUpdate to the given ids, or to every transaction
+    matching the list_transaction filters, with a single UPDATE. Rows that
+    already hold the new values are left untouched.
+
+    Returns the number of rows changed. Raises ValueError when there is
+    nothing to update, the target set is not exactly one of ids / filters,
+    or the filters would not narrow the set.
+    """
+    values = payload.model_dump(exclude_unset=True)
+    if not values:
+        raise ValueError("No fields to update")
+    if "description" in values:
+        values["merchant_key"] = stored_merchant_key(values["description"])
+    if (transaction_ids is None) == (filters is None):
+        raise ValueError("Provide exactly one of transaction_ids or filter")
+
+    query = db.query(Transaction)
+    if transaction_ids is not None:
+        if not transaction_ids:
+            return 0
+        query = query.filter(Transaction.transaction_id == any_(
+            bindparam("transaction_ids", list(transaction_ids), type_=ARRAY(Uuid))
+        ))
+    else:
+        # No fuzzy matches: a look-alike payee must not be rewritten
+        query = apply_transaction_filters(query, **filters, fuzzy=False)
+        # Judged on the built query, so no-op values (uncategorized=false,
+        # a blank q) can't turn the filter into an update of every row
+        if query.whereclause is None:
+            raise ValueError("filter must narrow the set of transactions")
+
+    query = query.filter(or_(*(getattr(Transaction, k).is_distinct_from(v) for k, v in values.items())))
+
+    updated = query.update(values, synchronize_session=False)
+    db.commit()
+    return updated
+
+
+def _list_row_to_dict(row) -> Dict[str, Any]:
+    split = len(_LIST_KEYS)
+    item = dict(zip(_LIST_KEYS, row[:split]))
+    account = row[split:]
+    if account[0] is None:
+        item["account"] = None
+    else:
+        item["account"] = dict(zip(_LIST_ACCOUNT_KEYS, account))
+        item["account"]["status"] = "connected"  # AccountRead default
+    return item
+
+
+def apply_rules_to_transactions(
+        db: Session,
+        overwrite: bool = False,
+        batch_size: int = RULES_BATCH_SIZE,
+        on_batch: Optional[Callable[[int, int, int], None]] = None,
+) -> Dict[str, int]:
+    """
+    Re-runs the active CategoryRules over stored transactions: only the
+    uncategorized ones, or every transaction with overwrite=True (rows no rule
+    matches keep their category either way).
+
+    Walks the table in transaction_id order, batch_size rows at a time, and
+    writes each batch with one UPDATE per category it assigns; commits after
+    every batch and reports (batches, scanned, categorized) to on_batch.
+    """
+    matcher = crud_rule.get_rule_matcher(db)
+    totals = {"scanned": 0, "categorized": 0}
+    if not len(matcher):
+        return totals
+
+    batches = 0
+    after: Optional[UUID] = None
+    while True:
+        query = db.query(
+            Transaction.transaction_id,
+            Transaction.description,
+            Transaction.account_id,
+            Transaction.amount,
+            Transaction.category_id,
+        )
+        if not overwrite:
+            query = query.filter(Transaction.category_id.is_(None))
+        if after is not None:
+            query = query.filter(Transaction.transaction_id > after)
+        rows = query.order_by(Transaction.transaction_id).limit(batch_size).all()
+        if not rows:
+            break
+        after = rows[-1].transaction_id
+
+        ids_by_category: Dict[UUID, List[UUID]] = {}
+        for row in rows:
+            category_id = matcher.match(row.description, row.account_id, row.amount)
+            if category_id is not None and category_id != row.category_id:
+                ids_by_category.setdefault(category_id, []).append(row.transaction_id)
+
+        for category_id, ids in ids_by_category.items():
+            query = db.query(Transaction).filter(
+                Transaction.transaction_id == any_(bindparam("transaction_ids", ids, type_=ARRAY(Uuid)))
+            )
+            if not overwrite:
+                # Don't clobber a category set by hand since the batch was read
+                query = query.filter(Transaction.category_id.is_(None))
+            totals["categorized"] += query.update({"category_id": category_id}, synchronize_session=False)
+        db.commit()
+
+        batches += 1
+        totals["scanned"] += len(rows)
+        if on_batch is not None:
+            on_batch(batches, totals["scanned"], totals["categorized"])
+
+    return totals
+
+
+def backfill_merchant_keys(
+        db: Session,
+        batch_size: int = MERCHANT_BATCH_SIZE,
+        on_batch: Optional[Callable[[int, int, int], None]] = None,
+) -> Dict[str, int]:
+    """
+    Fills Transaction.merchant_key for rows stored before it existed (or whose
+    key is still NULL). Plaid's merchant_name is not kept, so these keys come
+    from the description; the next sync of a Plaid row replaces it.
+
+    Walks the NULL rows in transaction_id order, batch_size at a time, writes
+    each batch with a single UPDATE ... FROM unnest(ids, keys), commits, and
+    reports (batches, scanned, updated) to on_batch.
+    """
+    totals = {"scanned": 0, "updated": 0}
+    batches = 0
+    after: Optional[UUID] = None
+    while True:
+        query = db.query(Transaction.transaction_id, Transaction.description).filter(
+            Transaction.merchant_key.is_(None)
+        )
+        if after is not None:
+            query = query.filter(Transaction.transaction_id > after)
+        rows = query.order_by(Transaction.transaction_id).limit(batch_size).all()
+        if not rows:
+            break
+        after = rows[-1].transaction_id
+
+        # Rows without a usable key get NO_KEY, so they aren't picked up again
+        ids = [row.transaction_id for row in rows]
+        keys = [stored_merchant_key(row.description) for row in rows]
+        batch = func.unnest(
+            bindparam("transaction_ids", ids, type_=ARRAY(Uuid)),
+            bindparam("merchant_keys", keys, type_=ARRAY(String)),
+        ).table_valued("transaction_id", "merchant_key").render_derived()
+        result = db.execute(
+            update(Transaction)
+            .where(Transaction.transaction_id == batch.c.transaction_id)
+            .where(Transaction.merchant_key.is_(None))
+            .values(merchant_key=batch.c.merchant_key)
+            .execution_options(synchronize_session=False)
+        )
+        totals["updated"] += result.rowcount
+        db.commit()
+
+        batches += 1
+        totals["scanned"] += len(rows)
+        if on_batch is not None:
+            on_batch(batches, totals["scanned"], totals["updated"])
+
+    return totals
+
+
+def has_missing_merchant_keys(db: Session) -> bool:
+    return db.query(
+        db.query(Transaction.transaction_id).filter(Transaction.merchant_key.is_(None)).exists()
+    ).scalar()
+
+
 def update_transaction(db: Session, transaction_id: UUID, payload) -> Optional[Transaction]:
     """
     Updates a transaction's category or description.
@@ -82,6 +577,8 @@ def update_transaction(db: Session, transaction_id: UUID, payload) -> Optional[T
     update_data = payload.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_transaction, key, value)
+    if "description" in update_data:
+        db_transaction.merchant_key = stored_merchant_key(db_transaction.description)
 
     db.add(db_transaction)
     db.commit()
@@ -101,70 +598,244 @@ def delete_transaction(db: Session, transaction_id: UUID) -> Optional[Transactio
 
 # --- NEW HELPER FUNCTIONS FOR PLAID SYNC ---
 
-def create_or_update_transaction(db: Session, tx_data: Dict[str, Any]) -> Transaction:
+def plaid_transaction_to_schema(tx_data: Dict[str, Any], account_id: UUID) -> TransactionCreate:
     """
-    Creates a new transaction or updates an existing one
-    based on Plaid transaction data.
+    Maps a raw Plaid transaction dict onto our TransactionCreate schema.
     """
+    # Plaid amounts are (positive = inflow, negative = outflow)
+    # We want (positive = outflow, negative = inflow) for budgeting
+    # So we must invert the amount.
+    amount_for_budget = -tx_data['amount']
+
+    return TransactionCreate(
+        plaid_transaction_id=tx_data['transaction_id'],
+        account_id=account_id,
+        category_id=None,  # New transactions are uncategorized
+        description=tx_data['name'],  # Use Plaid's 'name' as description
+        amount=amount_for_budget,
+        date=tx_data['date'],
+        datetime=tx_data.get('datetime'),  # Use .get() for optional fields
+        pending=tx_data['pending']
+    )
+
+
+def _import_hash(row: Dict[str, Any], external_id: Optional[str], seen: Counter) -> str:
+    """
+    Bank transaction id when the file has one, otherwise the row content plus
+    its occurrence number within the file, so two identical coffees on the
+    same day both import but re-importing the file adds nothing.
+    """
+    if external_id:
+        key = f"{row['account_id']}|id|{external_id}"
+    else:
+        description = " ".join(row["description"].lower().split())
+        content = f"{row['account_id']}|{row['date'].isoformat()}|{row['amount']:.2f}|{description}"
+        seen[content] += 1
+        key = f"{content}|{seen[content]}"
+    return hashlib.sha256(key.encode()).hexdigest()
 
-    plaid_tx_id = tx_data['transaction_id']
-
-    # 1. Check if we already have this transaction
-    db_transaction = get_transaction_by_plaid_id(db, plaid_tx_id)
-
-    # 2. Get our internal account_id
-    db_account = get_account_by_plaid_account_id(db, tx_data['account_id'])
-    if not db_account:
-        # This should not happen if accounts are synced first,
-        # but it's good to be defensive.
-        raise Exception(f"Account {tx_data['account_id']} not found in database.")
 
-    # 3. Create or Update
-    if db_transaction is None:
-        # Create new transaction
+def _format_validation_error(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" if err["loc"] else err["msg"]
+        for err in e.errors()
+    )
 
-        # Plaid amounts are (positive = inflow, negative = outflow)
-        # We want (positive = outflow, negative = inflow) for budgeting
-        # So we must invert the amount.
-        amount_for_budget = -tx_data['amount']
 
-        new_tx_schema = TransactionCreate(
-            plaid_transaction_id=tx_data['transaction_id'],
-            account_id=db_account.id,
-            category_id=None,  # New transactions are uncategorized
-            description=tx_data['name'],  # Use Plaid's 'name' as description
-            amount=amount_for_budget,
-            date=tx_data['date'],
-            datetime=tx_data.get('datetime'),  # Use .get() for optional fields
-            pending=tx_data['pending']
+def import_transactions(
+        db: Session,
+        rows: Iterator[Tuple[int, Dict[str, Any]]],
+        account_id: Optional[UUID] = None,
+        invert_amounts: bool = False,
+        batch_size: int = IMPORT_BATCH_SIZE,
+) -> Dict[str, Any]:
+    """
+    Loads (row_number, fields) pairs from backend.importers into transactions.
+
+    Rows are validated against TransactionCreate (account_id defaults to the
+    given one), uncategorized rows get the first matching CategoryRule, and
+    rows are COPYed in batches into a temporary staging table, then
+    moved with a single INSERT ... SELECT ... ON CONFLICT (import_hash)
+    DO NOTHING, so duplicates of earlier imports are skipped. Invalid rows
+    are reported, not fatal. Commits once at the end.
+    """
+    account_ids = {a for (a,) in db.query(Account.id)}
+    category_ids = {c for (c,) in db.query(Category.category_id)}
+    matcher = crud_rule.get_rule_matcher(db)
+
+    report = {"rows": 0, "imported": 0, "duplicates": 0, "failed": 0, "errors": []}
+    seen: Counter = Counter()
+    staged = 0
+
+    staging = _import_staging_table()
+    staging.create(db.connection())
+    cursor = db.connection().connection.cursor()
+    copy_sql = f"COPY {staging.name} ({', '.join(c.name for c in staging.columns)}) FROM STDIN WITH (FORMAT csv)"
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffered = 0
+
+    def fail(row_number: int, error: str) -> None:
+        report["failed"] += 1
+        if len(report["errors"]) < IMPORT_MAX_ERRORS:
+            report["errors"].append({"row": row_number, "error": error})
+
+    def copy_buffer() -> None:
+        buffer.seek(0)
+        cursor.copy_expert(copy_sql, buffer)
+        buffer.seek(0)
+        buffer.truncate()
+
+    for row_number, fields in rows:
+        report["rows"] += 1
+        fields.setdefault("description", "")
+        if account_id is not None:
+            fields.setdefault("account_id", account_id)
+        try:
+            tx = TransactionCreate(**fields)
+        except ValidationError as e:
+            fail(row_number, _format_validation_error(e))
+            continue
+        if tx.account_id not in account_ids:
+            fail(row_number, f"account_id: account {tx.account_id} not found")
+            continue
+        if tx.category_id is not None and tx.category_id not in category_ids:
+            fail(row_number, f"category_id: category {tx.category_id} not found")
+            continue
+
+        row = tx.model_dump()
+        row["import_hash"] = _import_hash(row, fields.get("external_id"), seen)
+        row["transaction_id"] = uuid.uuid4()
+        row["merchant_key"] = stored_merchant_key(row["description"])
+        if invert_amounts:
+            row["amount"] = -row["amount"]
+        if row["category_id"] is None:
+            row["category_id"] = matcher.match(row["description"], row["account_id"], row["amount"])
+        # None -> empty unquoted field -> NULL
+        writer.writerow([row[c.name] for c in staging.columns])
+        buffered += 1
+        if buffered >= batch_size:
+            copy_buffer()
+            staged += buffered
+            buffered = 0
+
+    if buffered:
+        copy_buffer()
+        staged += buffered
+
+    if staged:
+        columns = [c.name for c in staging.columns]
+        # COPY reads "" as NULL; these two are never NULL once computed
+        not_null = {"description", "merchant_key"}
+        stmt = (
+            insert(Transaction)
+            .from_select(
+                columns,
+                select(*[
+                    func.coalesce(staging.c[name], "") if name in not_null else staging.c[name]
+                    for name in columns
+                ]),
+            )
+            .on_conflict_do_nothing(index_elements=[Transaction.import_hash])
         )
-        db_transaction = Transaction(**new_tx_schema.model_dump())
-        db.add(db_transaction)
-
-    else:
-        # Update existing transaction
-        db_transaction.description = tx_data['name']
-        db_transaction.amount = -tx_data['amount']  # Update amount
-        db_transaction.date = tx_data['date']
-        db_transaction.datetime = tx_data.get('datetime')
-        db_transaction.pending = tx_data['pending']
-        db.add(db_transaction)
-
-    db.commit()
-    db.refresh(db_transaction)
-    return db_transaction
+        report["imported"] = db.execute(stmt).rowcount
+        report["duplicates"] = staged - report["imported"]
+
+    db.commit()  # also drops the staging table
+    return report
+
+
+def _import_staging_table() -> Table:
+    return Table(
+        "transaction_import_staging",
+        MetaData(),
+        *[
+            Column(name, Transaction.__table__.c[name].type)
+            for name in (
+                "transaction_id", "account_id", "category_id", "description",
+                "merchant_key", "amount", "date", "datetime", "pending", "import_hash",
+            )
+        ],
+        prefixes=["TEMPORARY"],
+        postgresql_on_commit="DROP",
+    )
+
+
+def bulk_upsert_plaid_transactions(
+        db: Session,
+        transactions: List[Dict[str, Any]],
+        account_map: Dict[str, UUID],
+        refresh_accounts: Optional[Callable[[], Dict[str, UUID]]] = None,
+) -> int:
+    """
+    Writes a whole page of Plaid 'added' + 'modified' transactions with a single
+    INSERT ... ON CONFLICT (plaid_transaction_id) DO UPDATE. Uncategorized rows
+    get the category of the first CategoryRule matching their description or
+    Plaid merchant_name.
 
+    Accounts are resolved from account_map (plaid_account_id -> Account.id), built
+    once per sync run. If the page references an account that is not in the map,
+    refresh_accounts is called once and the map is updated in place.
 
-def delete_transaction_by_plaid_id(db: Session, plaid_transaction_id: str) -> Optional[Transaction]:
+    Does NOT commit; the caller commits once per sync page.
     """
-    Deletes a transaction from our database given
-    a Plaid transaction ID (from the 'removed' list).
+    if not transactions:
+        return 0
+
+    missing = {tx['account_id'] for tx in transactions} - account_map.keys()
+    if missing and refresh_accounts is not None:
+        account_map.update(refresh_accounts())
+        missing -= account_map.keys()
+    if missing:
+        # This should not happen if accounts are synced first
+        raise Exception(f"Accounts {sorted(missing)} not found in database.")
+
+    # Postgres refuses to touch the same row twice in one ON CONFLICT statement,
+    # so collapse duplicates within the page (last one wins).
+    matcher = crud_rule.get_rule_matcher(db)
+    rows_by_plaid_id: Dict[str, Dict[str, Any]] = {}
+    for tx_data in transactions:
+        row = plaid_transaction_to_schema(tx_data, account_map[tx_data['account_id']]).model_dump()
+        row['transaction_id'] = uuid.uuid4()
+        row['merchant_key'] = stored_merchant_key(row['description'], tx_data.get('merchant_name'))
+        row['category_id'] = matcher.match(
+            row['description'], row['account_id'], row['amount'], merchant_name=tx_data.get('merchant_name')
+        )
+        rows_by_plaid_id[row['plaid_transaction_id']] = row
+
+    stmt = insert(Transaction).values(list(rows_by_plaid_id.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Transaction.plaid_transaction_id],
+        # Plaid-owned fields are refreshed; an existing
+        # category (manual or from a rule) is kept, rules only fill in blanks
+        set_={
+            "category_id": func.coalesce(Transaction.__table__.c.category_id, stmt.excluded.category_id),
+            "description": stmt.excluded.description,
+            "merchant_key": stmt.excluded.merchant_key,
+            "amount": stmt.excluded.amount,
+            "date": stmt.excluded.date,
+            "datetime": stmt.excluded.datetime,
+            "pending": stmt.excluded.pending,
+        },
+    )
+    db.execute(stmt)
+    return len(rows_by_plaid_id)
+
+
+def bulk_delete_transactions_by_plaid_ids(db: Session, plaid_transaction_ids: List[str]) -> int:
     """
-    db_transaction = get_transaction_by_plaid_id(db, plaid_transaction_id)
+    Deletes every transaction in a Plaid 'removed' list with a single
+    DELETE ... WHERE plaid_transaction_id = ANY(...).
 
-    if db_transaction:
-        db.delete(db_transaction)
-        db.commit()
-        return db_transaction
+    Does NOT commit; the caller commits once per sync page.
+    """
+    if not plaid_transaction_ids:
+        return 0
 
-    return None
+    stmt = delete(Transaction).where(
+        Transaction.plaid_transaction_id == any_(
+            bindparam("plaid_transaction_ids", list(plaid_transaction_ids), type_=ARRAY(String))
+        )
+    )
+    result = db.execute(stmt)
+    return result.rowcount
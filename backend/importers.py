@@ -0,0 +1,178 @@
+"""
+Streaming parsers for transaction files uploaded to POST /transactions/import.
+
+Each parser reads a binary file object incrementally and yields
+(row_number, fields) pairs, where fields uses TransactionCreate's names plus
+an optional `external_id` (the bank's own transaction id, used for
+de-duplication). Values are left as strings; validation happens in
+crud.transaction.import_transactions.
+"""
+import codecs
+import csv
+import html
+import io
+import re
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+
+# CSV header -> TransactionCreate field; headers are matched case-insensitively
+CSV_COLUMNS = {
+    "date": "date",
+    "posted date": "date",
+    "transaction date": "date",
+    "description": "description",
+    "name": "description",
+    "payee": "description",
+    "amount": "amount",
+    "account_id": "account_id",
+    "category_id": "category_id",
+    "pending": "pending",
+    "datetime": "datetime",
+    "id": "external_id",
+    "transaction_id": "external_id",
+}
+
+_OFX_CHUNK_SIZE = 64 * 1024
+# The header must declare the encoding within this many bytes
+_OFX_MAX_HEADER_SIZE = 64 * 1024
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9_.]+)>([^<]*)")
+_OFX_FIELDS = {"FITID", "DTPOSTED", "TRNAMT", "NAME", "MEMO", "PAYEE"}
+# Header ahead of <OFX>: `<?xml ... encoding="..."?>` (OFX 2.x) or
+# ENCODING: / CHARSET: lines (OFX 1.x SGML)
+_OFX_BODY = re.compile(rb"<OFX\b", re.IGNORECASE)
+_OFX_XML_ENCODING = re.compile(rb"""<\?xml[^>]*\bencoding\s*=\s*["']([A-Za-z0-9._-]+)["']""", re.IGNORECASE)
+_OFX_SGML_HEADER = re.compile(rb"^\s*(ENCODING|CHARSET)\s*:\s*(\S+)", re.IGNORECASE | re.MULTILINE)
+
+
+def iter_csv_rows(fileobj: BinaryIO) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """
+    Rows of a CSV with a header line. Unknown columns are ignored; row numbers
+    are file line numbers (the header is line 1).
+    """
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    reader = csv.reader(text)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = [CSV_COLUMNS.get(h.strip().lower()) for h in header]
+    if "date" not in columns or "amount" not in columns:
+        raise ValueError("CSV header must include date and amount columns")
+
+    for values in reader:
+        if not any(v.strip() for v in values):
+            continue
+        fields = {}
+        for column, value in zip(columns, values):
+            value = value.strip()
+            if column and value:
+                fields[column] = value
+        yield reader.line_num, fields
+
+
+def _ofx_date(value: str) -> str:
+    # YYYYMMDD[HHMMSS[.XXX]][[gmt offset:tz name]]; only the date is kept
+    return datetime.strptime(value.strip()[:8], "%Y%m%d").date().isoformat()
+
+
+def _ofx_encoding(head: bytes) -> str:
+    """
+    Codec for an OFX file, from the header at the start of head: the XML
+    declaration's encoding, or CHARSET (1252 -> cp1252, ISO-8859-1, ...)
+    unless ENCODING is UTF-8. UTF-8 when nothing (usable) is declared.
+    """
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    body = _OFX_BODY.search(head)
+    header = head[:body.start()] if body else head
+
+    name = "utf-8"
+    declared = _OFX_XML_ENCODING.search(header)
+    if declared:
+        name = declared.group(1).decode("ascii")
+    else:
+        fields = {key.upper().decode("ascii"): value.upper().decode("latin-1")
+                  for key, value in _OFX_SGML_HEADER.findall(header)}
+        charset = fields.get("CHARSET", "NONE")
+        if fields.get("ENCODING") != "UTF-8" and charset != "NONE":
+            name = f"cp{charset}" if charset.isdigit() else charset
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return "utf-8"
+
+
+def _iter_ofx_tags(fileobj: BinaryIO) -> Iterator[Tuple[bool, str, str]]:
+    """
+    (is_closing, TAG, text) for every tag, reading the file in chunks. Bytes
+    are decoded incrementally in the encoding the header declares (see
+    _ofx_encoding), so characters split across chunks survive; text has
+    character references (&amp;, &lt;, ...) decoded.
+    """
+    decoder = None
+    head = b""  # raw bytes held back until the header has been read
+    pending = ""
+    while True:
+        chunk = fileobj.read(_OFX_CHUNK_SIZE)
+        text = chunk
+        if isinstance(chunk, bytes):
+            if decoder is None:
+                head += chunk
+                if chunk and not _OFX_BODY.search(head) and len(head) < _OFX_MAX_HEADER_SIZE:
+                    continue
+                decoder = codecs.getincrementaldecoder(_ofx_encoding(head))(errors="replace")
+                text = decoder.decode(head)
+            else:
+                text = decoder.decode(chunk)
+        pending += text
+        if not chunk:
+            break
+        # Keep a possibly incomplete trailing tag for the next chunk
+        cut = pending.rfind("<")
+        if cut <= 0:
+            continue
+        complete, pending = pending[:cut], pending[cut:]
+        for match in _OFX_TAG.finditer(complete):
+            yield match.group(1) == "/", match.group(2).upper(), html.unescape(match.group(3).strip())
+    if decoder is not None:
+        pending += decoder.decode(b"", final=True)
+    for match in _OFX_TAG.finditer(pending):
+        yield match.group(1) == "/", match.group(2).upper(), html.unescape(match.group(3).strip())
+
+
+def iter_ofx_rows(fileobj: BinaryIO) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """
+    <STMTTRN> records of an OFX / QFX statement (SGML 1.x or XML 2.x).
+    Row numbers count transactions from 1. OFX amounts are negative for
+    debits, so they are inverted to this app's positive = outflow.
+    """
+    row = 0
+    current: Optional[Dict[str, str]] = None
+    for closing, tag, value in _iter_ofx_tags(fileobj):
+        if tag == "STMTTRN":
+            if not closing:
+                current = {}
+                continue
+            if current is not None:
+                row += 1
+                yield row, _ofx_fields(current)
+            current = None
+        elif current is not None and not closing and tag in _OFX_FIELDS and value:
+            current[tag] = value
+
+
+def _ofx_fields(record: Dict[str, str]) -> Dict[str, str]:
+    fields = {}
+    if "DTPOSTED" in record:
+        try:
+            fields["date"] = _ofx_date(record["DTPOSTED"])
+        except ValueError:
+            fields["date"] = record["DTPOSTED"]
+    if "TRNAMT" in record:
+        amount = record["TRNAMT"].replace(",", ".")
+        fields["amount"] = amount[1:] if amount.startswith("-") else "-" + amount.lstrip("+")
+    description = record.get("NAME") or record.get("PAYEE") or record.get("MEMO")
+    if description:
+        fields["description"] = description
+    if "FITID" in record:
+        fields["external_id"] = record["FITID"]
+    return fields
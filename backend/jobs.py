@@ -0,0 +1,229 @@
+"""
+In-process background job runner.
+
+Jobs are persisted in the `jobs` table (so their status can be polled from any
+request) and executed on a small local thread pool; there is no external broker.
+"""
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from os import getenv
+from typing import Any, Callable, Dict
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from . import models
+from .crud import job as crud_job
+from .crud import plaid as crud_plaid
+from .crud import transaction as crud_transaction
+from .database import SessionLocal
+
+JOB_WORKERS = int(getenv("JOB_WORKERS", "2"))
+# Webhooks for the same item within this window collapse into one sync
+PLAID_WEBHOOK_DEBOUNCE_SECONDS = float(getenv("PLAID_WEBHOOK_DEBOUNCE_SECONDS", "30"))
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job-worker")
+# Serializes the "is there already an active job?" check with job creation
+_enqueue_lock = threading.Lock()
+
+# PlaidItem.id -> timer of the pending (debounced) webhook sync
+_pending_syncs: dict[UUID, threading.Timer] = {}
+_pending_lock = threading.Lock()
+
+
+def enqueue_plaid_sync(db: Session, plaid_item: models.PlaidItem, client) -> models.BackgroundJob:
+    """
+    Queues a balance + transaction sync for one PlaidItem and returns the job.
+    If a sync for the item is already queued or running, that job is returned
+    instead of starting a second one on the same cursor.
+    """
+    with _enqueue_lock:
+        db_job = crud_job.get_active_job(db, kind="plaid_sync", item_id=plaid_item.id)
+        if db_job is not None:
+            return db_job
+        db_job = crud_job.create_job(db, kind="plaid_sync", item_id=plaid_item.id)
+
+    _executor.submit(_run_plaid_sync, db_job.id, client)
+    return db_job
+
+
+def schedule_plaid_sync(item_id: UUID, client, delay: float = PLAID_WEBHOOK_DEBOUNCE_SECONDS) -> bool:
+    """
+    Debounced sync for webhook notifications. The first notification for an
+    item starts a timer; any further notifications within `delay` seconds are
+    coalesced into that one pending sync. Returns False if one was already pending.
+    """
+    with _pending_lock:
+        if item_id in _pending_syncs:
+            return False
+        timer = threading.Timer(delay, _fire_pending_sync, args=(item_id, client))
+        timer.daemon = True
+        _pending_syncs[item_id] = timer
+        timer.start()
+        return True
+
+
+def _fire_pending_sync(item_id: UUID, client) -> None:
+    with _pending_lock:
+        _pending_syncs.pop(item_id, None)
+
+    db = SessionLocal()
+    try:
+        active = crud_job.get_active_job(db, kind="plaid_sync", item_id=item_id)
+        if active is not None and active.status == "running":
+            # The running sync may already be past the new data; try again after another window
+            schedule_plaid_sync(item_id, client)
+            return
+
+        plaid_item = crud_plaid.get_plaid_item_by_id(db, item_id)
+        if plaid_item is not None:
+            enqueue_plaid_sync(db, plaid_item, client)
+    except Exception:
+        traceback.print_exc()
+    finally:
+        db.close()
+
+
+def _run_plaid_sync(job_id: UUID, client) -> None:
+    job_db = SessionLocal()
+    db = SessionLocal()
+    try:
+        db_job = crud_job.update_job(job_db, job_id, status="running", started_at=datetime.now(timezone.utc))
+        plaid_item = crud_plaid.get_plaid_item_by_id(db, db_job.item_id)
+        if plaid_item is None:
+            raise Exception("Plaid Item not found")
+
+        def on_page(pages_fetched: int, rows_applied: int, cursor: str) -> None:
+            crud_job.update_job(
+                job_db,
+                job_id,
+                pages_fetched=pages_fetched,
+                rows_applied=rows_applied,
+                cursor=cursor,
+            )
+
+        result = crud_plaid.sync_item(db, client, plaid_item, on_page=on_page)
+
+        crud_job.update_job(
+            job_db,
+            job_id,
+            status="succeeded",
+            result={key: value for key, value in result.items() if key != "message"},
+            cursor=result["next_cursor"],
+            finished_at=datetime.now(timezone.utc),
+        )
+    except Exception as e:
+        traceback.print_exc()
+        db.rollback()
+        job_db.rollback()
+        crud_job.update_job(
+            job_db,
+            job_id,
+            status="failed",
+            error=crud_plaid.describe_sync_error(e),
+            finished_at=datetime.now(timezone.utc),
+        )
+    finally:
+        db.close()
+        job_db.close()
+
+
+def _enqueue_singleton(db: Session, kind: str, run, *args) -> models.BackgroundJob:
+    """
+    Queues a job that runs over the whole table, so at most one of each kind
+    should be active; returns the already queued/running one if there is.
+    """
+    with _enqueue_lock:
+        db_job = crud_job.get_active_job(db, kind=kind)
+        if db_job is not None:
+            return db_job
+        db_job = crud_job.create_job(db, kind=kind)
+
+    _executor.submit(run, db_job.id, *args)
+    return db_job
+
+
+def _run_batch_job(job_id: UUID, work: Callable[..., Dict[str, Any]], applied_key: str, **params) -> None:
+    """
+    Runs work(db, on_batch=...) for a batch job. Progress goes to
+    pages_fetched (batches) and rows_applied (result[applied_key] so far);
+    the returned totals, plus params, become the job result.
+    """
+    job_db = SessionLocal()
+    db = SessionLocal()
+    try:
+        crud_job.update_job(job_db, job_id, status="running", started_at=datetime.now(timezone.utc))
+
+        def on_batch(batches: int, scanned: int, applied: int) -> None:
+            crud_job.update_job(job_db, job_id, pages_fetched=batches, rows_applied=applied)
+
+        result = work(db, on_batch=on_batch, **params)
+
+        crud_job.update_job(
+            job_db,
+            job_id,
+            status="succeeded",
+            result={**result, **params},
+            rows_applied=result[applied_key],
+            finished_at=datetime.now(timezone.utc),
+        )
+    except Exception as e:
+        traceback.print_exc()
+        db.rollback()
+        job_db.rollback()
+        crud_job.update_job(
+            job_db,
+            job_id,
+            status="failed",
+            error=str(e),
+            finished_at=datetime.now(timezone.utc),
+        )
+    finally:
+        db.close()
+        job_db.close()
+
+
+def enqueue_apply_rules(db: Session, overwrite: bool = False) -> models.BackgroundJob:
+    """Queues a re-run of the categorization rules over stored transactions."""
+    return _enqueue_singleton(db, "apply_rules", _run_apply_rules, overwrite)
+
+
+def _run_apply_rules(job_id: UUID, overwrite: bool) -> None:
+    _run_batch_job(job_id, crud_transaction.apply_rules_to_transactions, "categorized", overwrite=overwrite)
+
+
+def enqueue_merchant_key_backfill(db: Session) -> models.BackgroundJob:
+    """Queues filling Transaction.merchant_key on rows that have none."""
+    return _enqueue_singleton(db, "merchant_key_backfill", _run_merchant_key_backfill)
+
+
+def _run_merchant_key_backfill(job_id: UUID) -> None:
+    _run_batch_job(job_id, crud_transaction.backfill_merchant_keys, "updated")
+
+
+def backfill_merchant_keys_if_needed() -> None:
+    """Startup hook: queue the backfill when stored rows still lack a key."""
+    db = SessionLocal()
+    try:
+        if crud_transaction.has_missing_merchant_keys(db):
+            enqueue_merchant_key_backfill(db)
+    finally:
+        db.close()
+
+
+def recover_interrupted_jobs() -> None:
+    db = SessionLocal()
+    try:
+        crud_job.fail_interrupted_jobs(db)
+    finally:
+        db.close()
+
+
+def shutdown() -> None:
+    with _pending_lock:
+        for timer in _pending_syncs.values():
+            timer.cancel()
+        _pending_syncs.clear()
+    _executor.shutdown(wait=False, cancel_futures=True)
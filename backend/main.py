@@ -4,13 +4,16 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from .database import engine, SessionLocal
 from . import models
-from .routers import categories, budgets, transactions, plaid, summaries, accounts
+from .routers import categories, budgets, transactions, plaid, summaries, accounts, rules, jobs as jobs_router
 from .initial_data import init_db
+from .migrations import run_migrations
+from . import jobs
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     models.Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
     
     # Initialize default data
     db = SessionLocal()
@@ -18,9 +21,14 @@ async def lifespan(app: FastAPI):
         init_db(db)
     finally:
         db.close()
-    
+
+    jobs.recover_interrupted_jobs()
+    jobs.backfill_merchant_keys_if_needed()
+
     yield
 
+    jobs.shutdown()
+
 
 app = FastAPI(lifespan=lifespan)
 
@@ -31,6 +39,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 app.include_router(categories.router)
@@ -39,3 +48,5 @@ app.include_router(transactions.router)
 app.include_router(plaid.router)
 app.include_router(summaries.router)
 app.include_router(accounts.router)
+app.include_router(rules.router)
+app.include_router(jobs_router.router)
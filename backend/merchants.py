@@ -0,0 +1,65 @@
+"""
+Normalized merchant keys.
+
+Card descriptors for the same merchant differ per purchase
+("SQ *BLUE BOTTLE COFFEE 1234 SEATTLE WA", "SQ *BLUE BOTTLE COFFEE 5678 ...").
+merchant_key() reduces them to one stable, lowercase key
+("blue bottle coffee") that is stored on Transaction.merchant_key at ingest,
+so merchant reports can GROUP BY an indexed column.
+"""
+import re
+from typing import Optional
+
+MAX_KEY_LENGTH = 64
+# Stored for rows with no usable key, so NULL only means "not computed yet"
+# (what backfill_merchant_keys looks for)
+NO_KEY = ""
+
+# Payment processor / card network prefixes in front of the merchant name
+_PREFIX = re.compile(
+    r"^(?:(?:sq|tst|sp|pp|paypal|pos|debit card|debit|checkcard|check card|purchase|card purchase|recurring)(?:\s*\*\s*|\s+))+",
+)
+# Everything from a reference separator on ("AMZN Mktp US*9981D28F", "SAFEWAY #1234")
+_REFERENCE = re.compile(r"\s*[*#].*$")
+_DOMAIN = re.compile(r"^(?:www\.)?([a-z0-9-]+)\.(?:com|net|org|co|io)(?:/\S*)?$")
+_PUNCTUATION = re.compile(r"[^a-z0-9&' ]+")
+
+
+def _clean(text: str) -> str:
+    return " ".join(_PUNCTUATION.sub(" ", text).split())
+
+
+def merchant_key(description: Optional[str], merchant_name: Optional[str] = None) -> Optional[str]:
+    """
+    Plaid's merchant_name when present, otherwise the description with
+    processor prefixes, reference numbers, store numbers and locations
+    stripped. None when nothing usable is left.
+    """
+    if merchant_name and merchant_name.strip():
+        key = _clean(merchant_name.lower())
+        return key[:MAX_KEY_LENGTH] or None
+    if not description:
+        return None
+
+    text = " ".join(description.lower().split())
+    text = _PREFIX.sub("", text)
+    stripped = _REFERENCE.sub("", text)
+    if stripped:
+        text = stripped
+
+    tokens = []
+    for token in text.split():
+        # Store numbers, dates, phone numbers and card refs end the name
+        if any(ch.isdigit() for ch in token) and tokens:
+            break
+        domain = _DOMAIN.match(token)
+        tokens.append(domain.group(1) if domain else token)
+
+    key = _clean(" ".join(tokens))
+    return key[:MAX_KEY_LENGTH] or None
+
+
+def stored_merchant_key(description: Optional[str], merchant_name: Optional[str] = None) -> str:
+    """merchant_key() as written to Transaction.merchant_key: NO_KEY instead of None."""
+    key = merchant_key(description, merchant_name)
+    return NO_KEY if key is None else key
@@ -0,0 +1,151 @@
+"""
+Schema changes that Base.metadata.create_all() cannot make on an existing
+database: extensions, expression/opclass indexes, new columns and triggers.
+
+Every statement is idempotent and they run in order on each startup, right
+after create_all(). Append new steps to MIGRATIONS; never edit or reorder
+existing ones.
+"""
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateIndex
+
+from .crud.summary import CATEGORY_MONTH_TOTALS_SELECT
+from .models import Transaction
+
+
+def _create_index(table, name: str) -> str:
+    """CREATE INDEX IF NOT EXISTS for an Index declared in models.py."""
+    index = next(i for i in table.indexes if i.name == name)
+    return str(CreateIndex(index, if_not_exists=True).compile(dialect=postgresql.dialect()))
+
+
+# Statement-level: one aggregate upsert per INSERT/UPDATE/DELETE statement,
+# however many rows it touched (bulk sync, import, bulk_update). An UPDATE
+# subtracts the old rows and adds the new ones, which covers amount, date and
+# category changes alike; rows whose category and month didn't change cancel
+# out and are not written.
+_NEW_ROW_DELTAS = (
+    "SELECT category_id, CAST(date_trunc('month', date) AS date) AS month, amount, 1 AS n "
+    "FROM new_rows WHERE category_id IS NOT NULL"
+)
+_OLD_ROW_DELTAS = (
+    "SELECT category_id, CAST(date_trunc('month', date) AS date) AS month, -amount, -1 AS n "
+    "FROM old_rows WHERE category_id IS NOT NULL"
+)
+_APPLY_DELTAS = """
+        INSERT INTO category_month_totals AS t (category_id, month, total, transaction_count)
+        SELECT category_id, month, SUM(amount), SUM(n)
+        FROM ({deltas}) AS deltas (category_id, month, amount, n)
+        GROUP BY 1, 2
+        HAVING SUM(amount) <> 0 OR SUM(n) <> 0
+        ORDER BY 1, 2
+        ON CONFLICT (category_id, month) DO UPDATE
+        SET total = t.total + EXCLUDED.total,
+            transaction_count = t.transaction_count + EXCLUDED.transaction_count;"""
+
+# Each branch may only reference the transition tables its event defines
+_CATEGORY_MONTH_TOTALS_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION apply_category_month_deltas() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN{_APPLY_DELTAS.format(deltas=_NEW_ROW_DELTAS)}
+    ELSIF TG_OP = 'DELETE' THEN{_APPLY_DELTAS.format(deltas=_OLD_ROW_DELTAS)}
+    ELSE{_APPLY_DELTAS.format(deltas=_NEW_ROW_DELTAS + " UNION ALL " + _OLD_ROW_DELTAS)}
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def _category_month_trigger(event: str) -> str:
+    # Transition tables allow a single event per trigger
+    transition = {
+        "INSERT": "NEW TABLE AS new_rows",
+        "UPDATE": "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+        "DELETE": "OLD TABLE AS old_rows",
+    }[event]
+    return (
+        f"CREATE OR REPLACE TRIGGER category_month_totals_{event.lower()} "
+        f"AFTER {event} ON transactions REFERENCING {transition} "
+        "FOR EACH STATEMENT EXECUTE FUNCTION apply_category_month_deltas()"
+    )
+
+
+# (name, statement, required). A failing optional step is logged and skipped,
+# e.g. when the Postgres install lacks a contrib extension.
+MIGRATIONS: List[Tuple[str, str, bool]] = [
+    (
+        "pg_trgm extension",
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        False,
+    ),
+    (
+        "trigram index on transactions.description",
+        "CREATE INDEX IF NOT EXISTS ix_transactions_description_trgm "
+        "ON transactions USING gin (description gin_trgm_ops)",
+        False,
+    ),
+    *[
+        (f"index {name}", _create_index(Transaction.__table__, name), True)
+        for name in (
+            "ix_transactions_date_id",
+            "ix_transactions_account_date_id",
+            "ix_transactions_category_date_id",
+            "ix_transactions_uncategorized_date_id",
+        )
+    ],
+    # Superseded by the composite indexes above
+    ("drop ix_transactions_date", "DROP INDEX IF EXISTS ix_transactions_date", True),
+    ("drop ix_transactions_category_id", "DROP INDEX IF EXISTS ix_transactions_category_id", True),
+    (
+        "transactions.import_hash",
+        "ALTER TABLE transactions ADD COLUMN IF NOT EXISTS import_hash VARCHAR",
+        True,
+    ),
+    (
+        "index ix_transactions_import_hash",
+        _create_index(Transaction.__table__, "ix_transactions_import_hash"),
+        True,
+    ),
+    (
+        "transactions.merchant_key",
+        "ALTER TABLE transactions ADD COLUMN IF NOT EXISTS merchant_key VARCHAR",
+        True,
+    ),
+    (
+        "index ix_transactions_merchant_key_date",
+        _create_index(Transaction.__table__, "ix_transactions_merchant_key_date"),
+        True,
+    ),
+    ("function apply_category_month_deltas", _CATEGORY_MONTH_TOTALS_FUNCTION, True),
+    *[
+        (f"trigger category_month_totals_{event.lower()}", _category_month_trigger(event), True)
+        for event in ("INSERT", "UPDATE", "DELETE")
+    ],
+    # First boot with the triggers: seed the table (a no-op once it has rows;
+    # afterwards use `python -m backend.tools.rebuild_summaries`)
+    (
+        "populate category_month_totals",
+        "INSERT INTO category_month_totals (category_id, month, total, transaction_count) "
+        + CATEGORY_MONTH_TOTALS_SELECT
+        + " HAVING NOT EXISTS (SELECT 1 FROM category_month_totals)",
+        True,
+    ),
+]
+
+
+def run_migrations(engine: Engine) -> None:
+    for name, statement, required in MIGRATIONS:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(statement))
+        except DBAPIError as e:
+            if required:
+                raise
+            print(f"WARNING: skipped migration '{name}': {str(e.orig).splitlines()[0]}")
@@ -14,6 +14,8 @@ from sqlalchemy import (
     String,
     Boolean,
     Integer,
+    JSON,
+    Index,
 )
 from sqlalchemy.orm import relationship
 
@@ -67,18 +69,65 @@ class Transaction(Base):
 
     # NOTE: Keep this pointing to accounts.id (your current schema)
     account_id = Column(UUID, ForeignKey("accounts.id"), nullable=False)
-    category_id = Column(UUID, ForeignKey("categories.category_id", ondelete="SET NULL"), nullable=True, index=True)
+    category_id = Column(UUID, ForeignKey("categories.category_id", ondelete="SET NULL"), nullable=True)
 
     description = Column(Text)
+    # Normalized payee (backend.merchants.merchant_key), set at ingest; "" when
+    # none can be derived, NULL until computed
+    merchant_key = Column(String, nullable=True)
     amount = Column(DECIMAL(10, 2), nullable=False)  # Positive = outflow, Negative = inflow
-    date = Column(DATE, nullable=False, index=True)
+    date = Column(DATE, nullable=False)
     datetime = Column(TIMESTAMP(timezone=True), nullable=True)
     pending = Column(Boolean, default=False, nullable=False)
 
+    # Content hash of file-imported rows (see crud.transaction.import_transactions)
+    import_hash = Column(String, nullable=True)
+
     category = relationship("Category", back_populates="transactions")
     account = relationship("Account", back_populates="transactions")
 
 
+# Access paths of list_transaction (sorted by date desc, transaction_id desc)
+# and the summaries (date ranges). Existing databases get these through
+# migrations.py; check them with `python -m backend.tools.explain_queries`.
+Index("ix_transactions_date_id", Transaction.date.desc(), Transaction.transaction_id.desc())
+Index(
+    "ix_transactions_account_date_id",
+    Transaction.account_id, Transaction.date.desc(), Transaction.transaction_id.desc(),
+)
+Index(
+    "ix_transactions_category_date_id",
+    Transaction.category_id, Transaction.date.desc(), Transaction.transaction_id.desc(),
+)
+# Uncategorized inbox
+Index(
+    "ix_transactions_uncategorized_date_id",
+    Transaction.date.desc(), Transaction.transaction_id.desc(),
+    postgresql_where=Transaction.category_id.is_(None),
+)
+# Re-importing a file skips rows that are already there
+Index("ix_transactions_import_hash", Transaction.import_hash, unique=True)
+# Merchant reports: GROUP BY merchant_key over a date range
+Index("ix_transactions_merchant_key_date", Transaction.merchant_key, Transaction.date)
+
+
+class CategoryMonthTotal(Base):
+    """
+    SUM(amount) / COUNT(*) of categorized transactions per category and
+    calendar month. Maintained by triggers on transactions (see
+    migrations.py); never written by the app except by
+    crud.summary.rebuild_category_month_totals.
+    """
+    __tablename__ = "category_month_totals"
+
+    # No FK: rows of a deleted category are zeroed by the trigger as its
+    # transactions are uncategorized, and never joined to again
+    category_id = Column(UUID, primary_key=True)
+    month = Column(DATE, primary_key=True)  # first day of the month
+    total = Column(DECIMAL(14, 2), nullable=False, default=0)
+    transaction_count = Column(Integer, nullable=False, default=0)
+
+
 class Budget(Base):
     __tablename__ = "budgets"
 
@@ -92,6 +141,27 @@ class Budget(Base):
     category = relationship("Category", back_populates="budgets")
 
 
+class CategoryRule(Base):
+    """Auto-categorization rule, compiled into backend.rules.RuleMatcher."""
+    __tablename__ = "category_rules"
+
+    id = Column(UUID, primary_key=True, default=uuid.uuid4)
+    pattern = Column(Text, nullable=False)  # case-insensitive substring of the description (or Plaid merchant_name)
+    category_id = Column(UUID, ForeignKey("categories.category_id", ondelete="CASCADE"), nullable=False, index=True)
+
+    # Optional conditions
+    account_id = Column(UUID, ForeignKey("accounts.id", ondelete="CASCADE"), nullable=True)
+    min_amount = Column(DECIMAL(10, 2), nullable=True)
+    max_amount = Column(DECIMAL(10, 2), nullable=True)
+
+    priority = Column(Integer, nullable=False, default=100)  # lower wins
+    is_active = Column(Boolean, nullable=False, default=True)
+
+    created_at = Column(TIMESTAMP, server_default=func.now(), nullable=False)
+
+    category = relationship("Category")
+
+
 class PlaidItem(Base):
     __tablename__ = "plaid_items"
 
@@ -127,3 +197,27 @@ class Account(Base):
 
     item = relationship("PlaidItem", back_populates="accounts")
     transactions = relationship("Transaction", back_populates="account")
+
+
+class BackgroundJob(Base):
+    __tablename__ = "jobs"
+
+    id = Column(UUID, primary_key=True, default=uuid.uuid4)
+    kind = Column(String, nullable=False)  # plaid_sync|apply_rules|merchant_key_backfill
+    status = Column(String, nullable=False, default="queued", index=True)  # queued|running|succeeded|failed
+
+    item_id = Column(UUID, ForeignKey("plaid_items.id", ondelete="CASCADE"), nullable=True, index=True)
+
+    # Progress, updated while the job runs
+    pages_fetched = Column(Integer, nullable=False, default=0)
+    rows_applied = Column(Integer, nullable=False, default=0)
+    cursor = Column(String, nullable=True)
+
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    finished_at = Column(TIMESTAMP(timezone=True), nullable=True)
+
+    item = relationship("PlaidItem")
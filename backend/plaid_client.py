@@ -0,0 +1,104 @@
+"""
+Shared Plaid HTTP transport.
+
+The SDK client (used for /link, /item and /accounts calls) and the raw JSON
+calls (used for /transactions/sync, to avoid SDK cursor validation issues) go
+through the same urllib3 connection pool, so TLS connections are reused across
+pages, items and requests.
+"""
+import json
+import ssl
+from os import getenv
+from urllib.parse import urlparse
+
+import urllib3
+from dotenv import load_dotenv
+from plaid.api import plaid_api
+from plaid.api_client import ApiClient
+from plaid.configuration import Configuration
+
+load_dotenv()
+
+PLAID_ENVIRONMENT = getenv("PLAID_ENVIRONMENT", "Sandbox")
+
+PLAID_BASE_URLS = {
+    "Sandbox": "https://sandbox.plaid.com",
+    "Development": "https://development.plaid.com",
+    "Production": "https://production.plaid.com",
+}
+
+if PLAID_ENVIRONMENT not in PLAID_BASE_URLS:
+    raise ValueError("PLAID_ENVIRONMENT environment variable not set correctly")
+
+# PLAID_BASE_URL overrides the environment host, e.g. to point at backend/tools/fake_plaid.py
+PLAID_BASE_URL = getenv("PLAID_BASE_URL") or PLAID_BASE_URLS[PLAID_ENVIRONMENT]
+
+# Public URL of POST /plaid/webhook. New items get it at link time; existing
+# ones through POST /plaid/update_webhooks. Unset: no webhooks, sync on demand.
+PLAID_WEBHOOK_URL = getenv("PLAID_WEBHOOK_URL") or None
+
+# Keep-alive connections kept per host; should cover JOB_WORKERS plus request threads
+PLAID_POOL_MAXSIZE = int(getenv("PLAID_POOL_MAXSIZE", "10"))
+PLAID_CONNECT_TIMEOUT = float(getenv("PLAID_CONNECT_TIMEOUT", "5"))
+PLAID_READ_TIMEOUT = float(getenv("PLAID_READ_TIMEOUT", "60"))
+
+# Per-host (connect, read) timeouts; hosts not listed use the Plaid defaults above
+HOST_TIMEOUTS = {
+    urlparse(PLAID_BASE_URL).hostname: urllib3.Timeout(connect=PLAID_CONNECT_TIMEOUT, read=PLAID_READ_TIMEOUT),
+}
+DEFAULT_TIMEOUT = urllib3.Timeout(connect=PLAID_CONNECT_TIMEOUT, read=PLAID_READ_TIMEOUT)
+
+
+class _PlaidPoolManager(urllib3.PoolManager):
+    """
+    PoolManager that applies the per-host timeout whenever the caller does not
+    pass one (the SDK passes timeout=None unless _request_timeout is given).
+    """
+
+    def urlopen(self, method, url, redirect=True, **kw):
+        if kw.get("timeout") is None:
+            kw["timeout"] = HOST_TIMEOUTS.get(urlparse(url).hostname, DEFAULT_TIMEOUT)
+        return super().urlopen(method, url, redirect=redirect, **kw)
+
+
+config = Configuration(
+    host=PLAID_BASE_URL,
+    api_key={
+        "clientId": getenv("PLAID_CLIENT_ID"),
+        "secret": getenv("PLAID_SECRET"),
+    },
+)
+config.connection_pool_maxsize = PLAID_POOL_MAXSIZE
+
+api_client = ApiClient(config)
+# Plaid responses (especially /transactions/sync pages) compress well; urllib3 decodes gzip for us
+api_client.set_default_header("Accept-Encoding", "gzip")
+api_client.rest_client.pool_manager = _PlaidPoolManager(
+    num_pools=4,
+    maxsize=PLAID_POOL_MAXSIZE,
+    block=False,
+    cert_reqs=ssl.CERT_REQUIRED if config.verify_ssl else ssl.CERT_NONE,
+    ca_certs=config.ssl_ca_cert,
+)
+
+client = plaid_api.PlaidApi(api_client)
+
+_RAW_HEADERS = {
+    "Content-Type": "application/json",
+    "Accept-Encoding": "gzip",
+    "PLAID-CLIENT-ID": getenv("PLAID_CLIENT_ID"),
+    "PLAID-SECRET": getenv("PLAID_SECRET"),
+}
+
+
+def post(path: str, body: dict) -> dict:
+    """
+    POSTs a raw JSON body to the Plaid API over the shared pool.
+    Raises plaid.exceptions.ApiException on non-2xx responses, like the SDK does.
+    """
+    resp = api_client.rest_client.POST(
+        f"{PLAID_BASE_URL}{path}",
+        headers={key: value for key, value in _RAW_HEADERS.items() if value is not None},
+        body=body,
+    )
+    return json.loads(resp.data)
@@ -3,13 +3,14 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 
+from ..conditional import versioned
 from ..database import get_db
 from .. import models, schemas
 
 router = APIRouter(prefix="/accounts", tags=["Accounts"])
 
 
-@router.get("/", response_model=List[schemas.AccountRead])
+@router.get("/", response_model=List[schemas.AccountRead], dependencies=[versioned("accounts")])
 def list_accounts(db: Session = Depends(get_db)):
     """
     List all connected accounts.
@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 
 from .. import schemas
 from ..crud import category as crud_category
+from ..conditional import versioned
 from ..database import get_db
 
 router = APIRouter(
@@ -27,7 +28,11 @@ def create_category_group(
     return crud_category.create_category_group(db=db, new_group=group)
 
 
-@router.get("/category-groups", response_model=List[schemas.CategoryGroupWithCategories])
+@router.get(
+    "/category-groups",
+    response_model=List[schemas.CategoryGroupWithCategories],
+    dependencies=[versioned("category_groups", "categories")],
+)
 def list_category_groups(
     db: Session = Depends(get_db)
 ):
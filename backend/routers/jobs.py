@@ -0,0 +1,45 @@
+from uuid import UUID
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, status, HTTPException
+from sqlalchemy.orm import Session
+
+from .. import schemas
+from ..crud import job as crud_job
+from ..database import get_db
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["Jobs"],
+)
+
+
+@router.get("/", response_model=List[schemas.JobRead])
+def list_jobs(
+        item_id: Optional[UUID] = None,
+        limit: int = 20,
+        db: Session = Depends(get_db)
+):
+    """
+    List the most recent background jobs. Optionally filter by PlaidItem.
+    """
+    if limit > 100:
+        limit = 100
+    return crud_job.list_jobs(db=db, item_id=item_id, limit=limit)
+
+
+@router.get("/{job_id}", response_model=schemas.JobRead)
+def read_job(
+        job_id: UUID,
+        db: Session = Depends(get_db)
+):
+    """
+    Poll a background job: status plus progress (pages fetched, rows applied, cursor).
+    """
+    db_job = crud_job.get_job(db=db, job_id=job_id)
+    if db_job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Job not found'
+        )
+    return db_job
@@ -1,64 +1,37 @@
-from os import getenv
 from typing import List, Dict, Any
 
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
-from dotenv import load_dotenv
-from plaid.api import plaid_api
-import plaid
 from plaid.model.country_code import CountryCode
 from plaid.model.item_public_token_exchange_request import ItemPublicTokenExchangeRequest
+from plaid.model.item_webhook_update_request import ItemWebhookUpdateRequest
 from plaid.model.link_token_create_request import LinkTokenCreateRequest
 from plaid.model.link_token_create_request_user import LinkTokenCreateRequestUser
 from plaid.model.products import Products
-from plaid.model.accounts_get_request import AccountsGetRequest
 from plaid.exceptions import ApiException
-from plaid.configuration import Configuration
-from plaid.api_client import ApiClient
-import requests
 
-from .. import schemas
+from .. import schemas, jobs
 from ..crud import plaid as crud_plaid
-from ..crud import transaction as crud_transaction
 from ..database import get_db
+from ..plaid_client import PLAID_WEBHOOK_URL, client
+from ..plaid_webhooks import verified_webhook
 from backend.security import decrypt_token
 
-load_dotenv()
-
 router = APIRouter(prefix="/plaid", tags=["Plaid"])
 
-PLAID_ENVIRONMENT = getenv("PLAID_ENVIRONMENT", "Sandbox")
-
-if PLAID_ENVIRONMENT == "Sandbox":
-    host = plaid.Environment.Sandbox
-elif PLAID_ENVIRONMENT == "Development":
-    host = plaid.Environment.Development
-elif PLAID_ENVIRONMENT == "Production":
-    host = plaid.Environment.Production
-else:
-    raise ValueError("PLAID_ENVIRONMENT environment variable not set correctly")
-
-config = Configuration(
-    host=host,
-    api_key={
-        "clientId": getenv("PLAID_CLIENT_ID"),
-        "secret": getenv("PLAID_SECRET"),
-    },
-)
-
-api_client = ApiClient(config)
-client = plaid_api.PlaidApi(api_client)
-
 
 @router.post("/create_link_token", response_model=schemas.PlaidLinkTokenResponse)
 def create_link_token():
     try:
+        # Items linked with a webhook URL get SYNC_UPDATES_AVAILABLE notifications
+        webhook = {"webhook": PLAID_WEBHOOK_URL} if PLAID_WEBHOOK_URL else {}
         request = LinkTokenCreateRequest(
             user=LinkTokenCreateRequestUser(client_user_id="static-user-id-for-now"),
             client_name="My Personal Budget App",
             products=[Products("transactions")],
             country_codes=[CountryCode("US")],
             language="en",
+            **webhook,
         )
         response = client.link_token_create(request)
         return {"link_token": response.link_token}
@@ -135,12 +108,12 @@ def sync_accounts(payload: schemas.PlaidSyncRequest, db: Session = Depends(get_d
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/sync_transactions", response_model=Dict[str, Any])
+@router.post("/sync_transactions", response_model=schemas.JobRead, status_code=202)
 def sync_transactions(payload: schemas.PlaidSyncRequest, db: Session = Depends(get_db)):
     """
-    HEAVY: Sync transaction updates from Plaid.
-    Recommended: refresh balances first.
-    Uses raw HTTP request (via requests) instead of SDK to handle cursor=None safely.
+    HEAVY: Queue a transaction sync for one PlaidItem and return the job right away.
+    The job refreshes balances first, then pulls transaction pages from the stored cursor.
+    Poll GET /jobs/{job_id} for progress (pages fetched, rows applied, current cursor).
     """
     if payload.item_id:
         plaid_item = crud_plaid.get_plaid_item_by_id(db, payload.item_id)
@@ -152,37 +125,67 @@ def sync_transactions(payload: schemas.PlaidSyncRequest, db: Session = Depends(g
     if not plaid_item:
         raise HTTPException(status_code=404, detail="Plaid Item not found")
 
-    try:
-        access_token = decrypt_token(plaid_item.plaid_access_token_encrypted)
-    except Exception:
-        raise HTTPException(status_code=500, detail="Error decrypting access token")
+    return jobs.enqueue_plaid_sync(db=db, plaid_item=plaid_item, client=client)
 
-    cursor = plaid_item.transactions_cursor
 
-    try:
-        # ✅ Best UX: refresh balances before doing heavy sync
-        crud_plaid.sync_accounts_and_balances(
-            db=db,
-            client=client,
-            access_token=access_token,
-            item_id=plaid_item.id,
-        )
+# Webhook codes that mean "new transaction data is available for this item"
+SYNC_WEBHOOK_CODES = {"SYNC_UPDATES_AVAILABLE", "DEFAULT_UPDATE"}
 
-        result = crud_plaid.sync_transactions_from_plaid(
-            db=db,
-            access_token=access_token,
-            plaid_item_id=plaid_item.plaid_item_id,
-            cursor=cursor
-        )
 
-        return result
+@router.post("/webhook", response_model=Dict[str, Any], dependencies=[verified_webhook()])
+def plaid_webhook(payload: schemas.PlaidWebhookRequest, db: Session = Depends(get_db)):
+    """
+    Plaid webhook receiver, at the URL set in PLAID_WEBHOOK_URL. Requests
+    without a valid Plaid-Verification signature get 401.
 
-    except requests.exceptions.HTTPError as e:
-        print(f"Plaid HTTP Error: {e.response.text}")
-        raise HTTPException(status_code=e.response.status_code, detail=f"Plaid Sync Error: {e.response.text}")
-    except ApiException as e:
-        raise HTTPException(status_code=e.status, detail=e.body)
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
+    TRANSACTIONS SYNC_UPDATES_AVAILABLE / DEFAULT_UPDATE schedule a background
+    sync for the item; notifications arriving within
+    PLAID_WEBHOOK_DEBOUNCE_SECONDS of each other are coalesced into one sync.
+    Everything else is acknowledged and ignored (Plaid retries non-200 responses).
+    """
+    if payload.webhook_type != "TRANSACTIONS" or payload.webhook_code not in SYNC_WEBHOOK_CODES:
+        return {"status": "ignored"}
+
+    plaid_item = crud_plaid.get_plaid_item_by_plaid_item_id(db, payload.item_id) if payload.item_id else None
+    if not plaid_item:
+        return {"status": "ignored", "detail": "Unknown Plaid Item"}
+
+    scheduled = jobs.schedule_plaid_sync(plaid_item.id, client=client)
+    return {"status": "scheduled" if scheduled else "coalesced"}
+
+
+@router.post("/update_webhooks", response_model=Dict[str, Any])
+def update_webhooks(db: Session = Depends(get_db)):
+    """
+    Point every linked PlaidItem's webhook at PLAID_WEBHOOK_URL, for items
+    linked before it was set (or after it changed). Safe to repeat; stops at
+    the first Plaid error.
+    """
+    if not PLAID_WEBHOOK_URL:
+        raise HTTPException(status_code=400, detail="PLAID_WEBHOOK_URL is not set")
+
+    updated = 0
+    for plaid_item in crud_plaid.list_plaid_items(db):
+        try:
+            access_token = decrypt_token(plaid_item.plaid_access_token_encrypted)
+            client.item_webhook_update(ItemWebhookUpdateRequest(access_token=access_token, webhook=PLAID_WEBHOOK_URL))
+        except ApiException as e:
+            raise HTTPException(status_code=e.status, detail=e.body)
+        updated += 1
+    return {"status": "ok", "items_updated": updated}
+
+
+@router.post("/sync_all", response_model=schemas.PlaidSyncAllResponse, status_code=202)
+def sync_all(db: Session = Depends(get_db)):
+    """
+    HEAVY: Queue a balance + transaction sync for every linked PlaidItem and
+    return the jobs right away. Items that already have a sync queued or
+    running get that job back instead of a second one. Jobs run on the
+    background worker pool (JOB_WORKERS); poll GET /jobs/{job_id}.
+    """
+    return {
+        "jobs": [
+            jobs.enqueue_plaid_sync(db=db, plaid_item=plaid_item, client=client)
+            for plaid_item in crud_plaid.list_plaid_items(db)
+        ]
+    }
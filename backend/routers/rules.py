@@ -0,0 +1,112 @@
+from uuid import UUID
+from typing import List
+
+from fastapi import APIRouter, Depends, status, HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import schemas, jobs
+from ..crud import rule as crud_rule
+from ..database import get_db
+
+router = APIRouter(
+    prefix="/rules",
+    tags=["Rules"],
+)
+
+
+def _check_amount_range(rule) -> None:
+    if rule.min_amount is not None and rule.max_amount is not None and rule.min_amount > rule.max_amount:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='min_amount must not be greater than max_amount'
+        )
+
+
+@router.get("/", response_model=List[schemas.CategoryRuleRead])
+def list_rules(
+        db: Session = Depends(get_db)
+):
+    """
+    List all categorization rules, in the order they are tried
+    (priority, then creation time).
+    """
+    return crud_rule.list_rules(db=db)
+
+
+@router.post("/", response_model=schemas.CategoryRuleRead, status_code=status.HTTP_201_CREATED)
+def create_rule(
+        rule: schemas.CategoryRuleCreate,
+        db: Session = Depends(get_db)
+):
+    """
+    Create a rule: transactions whose description (or, for synced rows,
+    Plaid's merchant name) contains `pattern` (case-insensitive) and that meet
+    the optional account / amount conditions get `category_id` when they are
+    synced or imported uncategorized.
+    Amounts use this app's sign: positive = outflow.
+    """
+    _check_amount_range(rule)
+    try:
+        return crud_rule.create_rule(db=db, new_rule=rule)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Category or account not found'
+        )
+
+
+@router.put("/{rule_id}", response_model=schemas.CategoryRuleRead)
+def update_rule(
+        rule_id: UUID,
+        rule: schemas.CategoryRuleUpdate,
+        db: Session = Depends(get_db)
+):
+    """
+    Update a rule.
+    """
+    try:
+        db_rule = crud_rule.update_rule(db=db, rule_id=rule_id, update_data=rule)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Category or account not found'
+        )
+    if db_rule is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Rule not found'
+        )
+    return db_rule
+
+
+@router.delete("/{rule_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_rule(
+        rule_id: UUID,
+        db: Session = Depends(get_db)
+):
+    """
+    Delete a rule. Transactions it already categorized keep their category.
+    """
+    db_rule = crud_rule.delete_rule(db=db, rule_id=rule_id)
+    if db_rule is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Rule not found'
+        )
+
+
+@router.post("/apply", response_model=schemas.JobRead, status_code=status.HTTP_202_ACCEPTED)
+def apply_rules(
+        payload: schemas.ApplyRulesRequest = schemas.ApplyRulesRequest(),
+        db: Session = Depends(get_db)
+):
+    """
+    Re-run the rules over existing transactions as a background job; poll it
+    at `GET /jobs/{id}`. By default only uncategorized transactions are
+    touched; `overwrite=true` also re-categorizes the others (rows no rule
+    matches are left as they are).
+    """
+    return jobs.enqueue_apply_rules(db, overwrite=payload.overwrite)
@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session, selectinload
-from sqlalchemy import func
+from sqlalchemy.orm import Session
 from typing import List, Optional
+from uuid import UUID
 from datetime import datetime, date
 from decimal import Decimal
 
 from .. import models, schemas
+from ..conditional import versioned
+from ..crud import summary as crud_summary
 from ..database import get_db
 
 router = APIRouter(
@@ -15,6 +17,14 @@ router = APIRouter(
 
 ZERO = Decimal("0.00")
 
+# Tables the budget summaries are computed from (category_month_totals only
+# changes together with transactions, through its triggers)
+BUDGET_TABLES = ("category_groups", "categories", "budgets", "transactions", "category_month_totals")
+DASHBOARD_TABLES = BUDGET_TABLES + ("accounts",)
+
+# Longest range /summary/trend serves in one request
+TREND_MAX_MONTHS = 120
+
 
 def get_month_range(month_str: str) -> tuple[date, date]:
     """
@@ -35,207 +45,65 @@ def get_month_range(month_str: str) -> tuple[date, date]:
     return start_date, end_date
 
 
-@router.get("/budget", response_model=schemas.BudgetSummaryResponse)
+@router.get("/budget", response_model=schemas.BudgetSummaryResponse, dependencies=[versioned(*BUDGET_TABLES)])
 def get_budget_summary(
     month: str = Query(..., pattern=r"^\d{4}-\d{2}$"),
     db: Session = Depends(get_db),
 ):
-    start_date, end_date = get_month_range(month)
-
-    # 1) Fetch Groups and Categories (Eager load categories; order by sort_order)
-    groups = (
-        db.query(models.CategoryGroup)
-        .options(selectinload(models.CategoryGroup.categories))
-        .order_by(models.CategoryGroup.sort_order)
-        .all()
-    )
-
-    # 2) Fetch Budgets for this month
-    budgets = (
-        db.query(models.Budget)
-        .filter(models.Budget.budget_month == start_date)
-        .all()
-    )
-    budget_map = {b.category_id: (b.planned_amount or ZERO) for b in budgets}
-
-    # 3) Fetch Transaction actuals for this month, ignoring uncategorized
-    trx_stats = (
-        db.query(
-            models.Transaction.category_id,
-            func.sum(models.Transaction.amount).label("total"),
-        )
-        .filter(
-            models.Transaction.date >= start_date,
-            models.Transaction.date < end_date,
-            models.Transaction.category_id.isnot(None),
-        )
-        .group_by(models.Transaction.category_id)
-        .all()
-    )
-    actual_map = {t.category_id: (t.total or ZERO) for t in trx_stats}
-
-    group_summaries: List[schemas.BudgetGroupSummary] = []
-
-    total_income_planned = ZERO
-    total_income_actual = ZERO
-    total_expense_planned = ZERO
-    total_expense_actual = ZERO
-
-    for group in groups:
-        cat_summaries: List[schemas.BudgetCategorySummary] = []
-        group_planned = ZERO
-        group_actual = ZERO
-        group_remaining = ZERO
-
-        sorted_categories = sorted(group.categories, key=lambda c: c.sort_order)
-
-        for cat in sorted_categories:
-            planned = budget_map.get(cat.category_id, ZERO)
-            raw_actual = actual_map.get(cat.category_id, ZERO)
-
-            # Your system uses:
-            # - Transaction.amount: Positive = outflow, Negative = inflow
-            # So income categories should show "actual income" as positive -> invert sign.
-            if cat.type == "income":
-                actual = -raw_actual if raw_actual else ZERO
-                remaining = planned - actual
-                is_over_budget = False  # income doesn't "over budget" in the same way
-                total_income_planned += planned
-                total_income_actual += actual
-
-            elif cat.type == "expense":
-                actual = raw_actual if raw_actual else ZERO
-                remaining = planned - actual
-                is_over_budget = remaining < ZERO
-                total_expense_planned += planned
-                total_expense_actual += actual
-
-            else:  # transfer
-                # Transfers typically excluded from high-level totals
-                actual = raw_actual if raw_actual else ZERO
-                remaining = planned - actual
-                is_over_budget = remaining < ZERO
-
-            group_planned += planned
-            group_actual += actual
-            group_remaining += remaining
-
-            cat_summaries.append(
-                schemas.BudgetCategorySummary(
-                    category_id=cat.category_id,
-                    name=cat.name,
-                    type=cat.type,
-                    planned=planned,
-                    actual=actual,
-                    remaining=remaining,
-                    is_over_budget=is_over_budget,
-                )
-            )
-
-        group_summaries.append(
-            schemas.BudgetGroupSummary(
-                group_id=group.category_group_id,
-                name=group.name,
-                categories=cat_summaries,
-                total_planned=group_planned,
-                total_actual=group_actual,
-                total_remaining=group_remaining,
-            )
+    start_date, _ = get_month_range(month)
+
+    # Per-category planned/actual with trailing averages, YTD and last-year
+    # comparison, group rollups and income/expense totals, computed by one SQL
+    # statement (see crud.summary.get_month_summary)
+    summary = crud_summary.get_month_summary(db, start_date, with_history=True)
+
+    group_summaries: List[schemas.BudgetGroupSummary] = [
+        schemas.BudgetGroupSummary(
+            group_id=group["group_id"],
+            name=group["name"],
+            categories=[schemas.BudgetCategorySummary(**cat) for cat in group["categories"]],
+            total_planned=group["total_planned"],
+            total_actual=group["total_actual"],
+            total_remaining=group["total_remaining"],
         )
+        for group in summary["groups"]
+    ]
 
     # ✅ Unassigned / To be assigned (zero-based budgeting)
-    to_be_assigned = total_income_planned - total_expense_planned
+    to_be_assigned = summary["income_planned"] - summary["expense_planned"]
 
     return schemas.BudgetSummaryResponse(
         month=month,
         groups=group_summaries,
-        total_income_planned=total_income_planned,
-        total_income_actual=total_income_actual,
-        total_expense_planned=total_expense_planned,
-        total_expense_actual=total_expense_actual,
+        total_income_planned=summary["income_planned"],
+        total_income_actual=summary["income_actual"],
+        total_expense_planned=summary["expense_planned"],
+        total_expense_actual=summary["expense_actual"],
         to_be_assigned=to_be_assigned,
     )
 
 
-@router.get("/dashboard", response_model=schemas.DashboardSummaryResponse)
+@router.get("/dashboard", response_model=schemas.DashboardSummaryResponse, dependencies=[versioned(*DASHBOARD_TABLES)])
 def get_dashboard_summary(
     month: str = Query(..., pattern=r"^\d{4}-\d{2}$"),
     db: Session = Depends(get_db),
 ):
     start_date, end_date = get_month_range(month)
 
-    # 1) Fetch Groups and Categories (Eager loading)
-    groups = (
-        db.query(models.CategoryGroup)
-        .options(selectinload(models.CategoryGroup.categories))
-        .order_by(models.CategoryGroup.sort_order)
-        .all()
-    )
+    # 1) Budget totals per group and overall, in one statement
+    summary = crud_summary.get_month_summary(db, start_date)
 
-    # 2) Fetch Budgets for this month
-    budgets = (
-        db.query(models.Budget)
-        .filter(models.Budget.budget_month == start_date)
-        .all()
-    )
-    budget_map = {b.category_id: (b.planned_amount or ZERO) for b in budgets}
-
-    # 3) Fetch Transaction actuals for this month, ignoring uncategorized
-    trx_stats = (
-        db.query(
-            models.Transaction.category_id,
-            func.sum(models.Transaction.amount).label("total"),
-        )
-        .filter(
-            models.Transaction.date >= start_date,
-            models.Transaction.date < end_date,
-            models.Transaction.category_id.isnot(None),
+    dashboard_groups: List[schemas.DashboardGroupStat] = [
+        schemas.DashboardGroupStat(
+            group_id=group["group_id"],
+            name=group["name"],
+            planned=group["total_planned"],
+            actual=group["total_actual"],
         )
-        .group_by(models.Transaction.category_id)
-        .all()
-    )
-    actual_map = {t.category_id: (t.total or ZERO) for t in trx_stats}
-
-    income_planned = ZERO
-    income_actual = ZERO
-    expense_planned = ZERO
-    expense_actual = ZERO
-
-    dashboard_groups: List[schemas.DashboardGroupStat] = []
-
-    for group in groups:
-        g_planned = ZERO
-        g_actual = ZERO
-
-        for cat in group.categories:
-            planned = budget_map.get(cat.category_id, ZERO)
-            raw_actual = actual_map.get(cat.category_id, ZERO)
+        for group in summary["groups"]
+    ]
 
-            if cat.type == "income":
-                actual = -raw_actual if raw_actual else ZERO
-                income_planned += planned
-                income_actual += actual
-            elif cat.type == "expense":
-                actual = raw_actual if raw_actual else ZERO
-                expense_planned += planned
-                expense_actual += actual
-            else:  # transfer
-                actual = raw_actual if raw_actual else ZERO
-                # Transfers excluded from totals
-
-            g_planned += planned
-            g_actual += actual
-
-        dashboard_groups.append(
-            schemas.DashboardGroupStat(
-                group_id=group.category_group_id,
-                name=group.name,
-                planned=g_planned,
-                actual=g_actual,
-            )
-        )
-
-    # ✅ 4) Accounts Snapshot (Persisted Plaid balances)
+    # ✅ 2) Accounts Snapshot (Persisted Plaid balances)
     # Use Account.current_balance instead of summing transactions
     accounts = (
         db.query(models.Account)
@@ -265,7 +133,7 @@ def get_dashboard_summary(
             )
         )
 
-    # 5) Recent Transactions (Filtered to current month)
+    # 3) Recent Transactions (Filtered to current month)
     recent_txs = (
         db.query(models.Transaction)
         .filter(models.Transaction.date >= start_date, models.Transaction.date < end_date)
@@ -277,13 +145,42 @@ def get_dashboard_summary(
 
     return schemas.DashboardSummaryResponse(
         month=month,
-        income_planned=income_planned,
-        income_actual=income_actual,
-        expense_planned=expense_planned,
-        expense_actual=expense_actual,
+        income_planned=summary["income_planned"],
+        income_actual=summary["income_actual"],
+        expense_planned=summary["expense_planned"],
+        expense_actual=summary["expense_actual"],
         total_balance=total_balance,
-        to_be_assigned=income_planned - expense_planned,
+        to_be_assigned=summary["income_planned"] - summary["expense_planned"],
         groups=dashboard_groups,
         accounts=account_summaries,
         recent_transactions=recent_tx_reads,
-    )
\ No newline at end of file
+    )
+
+@router.get("/trend", response_model=schemas.TrendResponse, dependencies=[versioned(*BUDGET_TABLES)])
+def get_trend(
+    from_month: str = Query(..., alias="from", pattern=r"^\d{4}-\d{2}$"),
+    to_month: str = Query(..., alias="to", pattern=r"^\d{4}-\d{2}$"),
+    group_id: Optional[UUID] = None,
+    category_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Planned vs. actual per category for every month from `from` to `to`
+    (YYYY-MM, inclusive), e.g. for a 12-month spending chart. Each category's
+    `planned` / `actual` arrays line up with `months`, with 0.00 for months
+    without a budget or activity. Optionally limited to one `group_id` or
+    `category_id`.
+    """
+    start_date, _ = get_month_range(from_month)
+    end_date, _ = get_month_range(to_month)
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (end_date.year - start_date.year) * 12 + end_date.month - start_date.month >= TREND_MAX_MONTHS:
+        raise HTTPException(status_code=400, detail=f"At most {TREND_MAX_MONTHS} months per request")
+
+    trend = crud_summary.get_trend(db, start_date, end_date, group_id=group_id, category_id=category_id)
+
+    return schemas.TrendResponse(
+        months=[m.strftime("%Y-%m") for m in trend["months"]],
+        categories=[schemas.TrendCategorySeries(**cat) for cat in trend["categories"]],
+    )
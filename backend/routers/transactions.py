@@ -1,13 +1,22 @@
+import csv
+import io
+import json
+import os
 from uuid import UUID
-from typing import Optional, List
-from datetime import date
+from typing import Optional, List, Literal
+from datetime import date, datetime
+from decimal import Decimal
 
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, status, HTTPException, UploadFile, File, Form
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from .. import schemas, models
+from .. import schemas, models, importers
+from ..merchants import stored_merchant_key
 from ..crud import transaction as crud_transaction
-from ..database import get_db
+from .. import jobs
+from ..database import get_db, SessionLocal
 
 router = APIRouter(
     prefix="/transactions",
@@ -15,6 +24,22 @@ router = APIRouter(
 )
 
 
+def _json_default(value):
+    # Same representations pydantic uses for TransactionRead
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps_json(content) -> bytes:
+    return json.dumps(content, default=_json_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
 @router.get("/", response_model=schemas.TransactionListResponse)
 def list_transactions(
         account_id: Optional[UUID] = None,
@@ -25,35 +50,221 @@ def list_transactions(
         q: Optional[str] = None,
         limit: int = 50,
         offset: int = 0,
+        cursor: Optional[str] = None,
+        total: schemas.TotalMode = "exact",
+        sort: schemas.TransactionSort = "date",
         db: Session = Depends(get_db)
 ):
     """
     List transactions with pagination and filters.
 
+    `total` picks how the matching row count is reported: `exact` (cached until
+    transactions change), `estimate` (planner estimate for very large sets,
+    flagged by `total_is_estimate`) or `none` (skip counting).
+
+    Pagination: either `offset`/`limit`, or pass the `next_cursor` from the
+    previous response as `cursor` (keyset pagination; constant cost per page).
+
     Can be filtered by:
     - `account_id`: To get transactions for a specific bank account.
     - `category_id`: To get transactions for a specific budget category.
     - `start_date`: The start of a date range (e.g., 2023-01-01)
     - `end_date`: The end of a date range (e.g., 2023-01-31)
     - `uncategorized`: If true, return only transactions with no category.
-    - `q`: Search text for transaction description.
+    - `q`: Search text for transaction description. Matches substrings and,
+      when the pg_trgm extension is available, similar words (typos,
+      abbreviations). Use `sort=relevance` to rank matches best-first
+      (offset pagination only).
     """
-    if limit > 200:
-        limit = 200
+    limit = max(1, min(limit, 200))
 
-    return crud_transaction.list_transaction(
-        db=db,
-        account_id=account_id,
-        category_id=category_id,
-        start_date=start_date,
-        end_date=end_date,
-        uncategorized=uncategorized,
-        q=q,
-        limit=limit,
-        offset=offset
+    try:
+        result = crud_transaction.list_transaction(
+            db=db,
+            account_id=account_id,
+            category_id=category_id,
+            start_date=start_date,
+            end_date=end_date,
+            uncategorized=uncategorized,
+            q=q,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            total_mode=total,
+            sort=sort,
+            as_rows=True
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    # Rows are plain column values already shaped like TransactionListResponse;
+    # returning a Response skips FastAPI's per-row response_model validation.
+    return Response(content=dumps_json(result), media_type="application/json")
+
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _stream_export(fmt: str, filters: dict):
+    # Owns its session: the response body is produced after the endpoint returns
+    db = SessionLocal()
+    try:
+        batches = crud_transaction.iter_transaction_export_rows(db, **filters)
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(crud_transaction.EXPORT_FIELDS)
+            for batch in batches:
+                writer.writerows(batch)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+        else:
+            for batch in batches:
+                yield b"".join(dumps_json(row._asdict()) + b"\n" for row in batch)
+    finally:
+        db.close()
+
+
+@router.get("/export")
+def export_transactions(
+        account_id: Optional[UUID] = None,
+        category_id: Optional[UUID] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        uncategorized: Optional[bool] = None,
+        q: Optional[str] = None,
+        format: Literal["csv", "ndjson"] = "csv",
+):
+    """
+    Export every transaction matching the `GET /transactions/` filters as CSV
+    or NDJSON (one JSON object per line), newest first.
+
+    The response is streamed from a server-side cursor, so a full year of
+    history never has to fit in memory. Amounts keep their exact decimal
+    value (a string in NDJSON).
+    """
+    filters = {
+        "account_id": account_id,
+        "category_id": category_id,
+        "start_date": start_date,
+        "end_date": end_date,
+        "uncategorized": uncategorized,
+        "q": q,
+    }
+    return StreamingResponse(
+        _stream_export(format, filters),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="transactions.{format}"'},
     )
 
 
+IMPORT_FORMATS = {
+    ".csv": "csv",
+    ".ofx": "ofx",
+    ".qfx": "ofx",
+}
+
+
+@router.post("/import", response_model=schemas.TransactionImportResponse)
+def import_transactions(
+        file: UploadFile = File(...),
+        account_id: Optional[UUID] = Form(None),
+        format: Optional[Literal["csv", "ofx"]] = Form(None),
+        invert_amounts: bool = Form(False),
+        db: Session = Depends(get_db)
+):
+    """
+    Bulk import transactions from a CSV or OFX/QFX file.
+
+    - `format`: `csv` or `ofx`; defaults from the file extension.
+    - `account_id`: account for rows without an `account_id` column (always
+      needed for OFX).
+    - `invert_amounts`: for CSVs where negative amounts are outflows (this app
+      stores outflows as positive). OFX amounts are converted automatically.
+
+    CSV needs a header with `date`, `amount` and usually `description`;
+    `account_id`, `category_id`, `pending`, `datetime` and a bank `id` are
+    optional. Rows already imported before (same bank id, or same content)
+    are skipped and counted as duplicates; invalid rows are reported by row
+    number and do not stop the import.
+    """
+    if format is None:
+        extension = os.path.splitext(file.filename or "")[1].lower()
+        format = IMPORT_FORMATS.get(extension)
+        if format is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='Unknown file type, pass format=csv or format=ofx'
+            )
+
+    parse = importers.iter_csv_rows if format == "csv" else importers.iter_ofx_rows
+    try:
+        return crud_transaction.import_transactions(
+            db=db,
+            rows=parse(file.file),
+            account_id=account_id,
+            invert_amounts=invert_amounts,
+        )
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'Could not read file: {e}'
+        )
+
+
+@router.post("/bulk_update", response_model=schemas.TransactionBulkUpdateResponse)
+def bulk_update_transactions(
+        payload: schemas.TransactionBulkUpdateRequest,
+        db: Session = Depends(get_db)
+):
+    """
+    Categorize / edit many transactions in one request and one UPDATE.
+
+    Target either an explicit list with `transaction_ids`, or every row that
+    `GET /transactions/` would return for `filter` (same fields, at least one
+    set), except that `q` only matches descriptions containing it, never
+    similar-looking ones. Returns the number of transactions changed.
+    """
+    try:
+        updated = crud_transaction.bulk_update_transactions(
+            db=db,
+            payload=payload.update,
+            transaction_ids=payload.transaction_ids,
+            filters=payload.filter.model_dump() if payload.filter else None,
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Category not found'
+        )
+    return {"updated": updated}
+
+
+@router.post("/backfill_merchant_keys", response_model=schemas.JobRead, status_code=status.HTTP_202_ACCEPTED)
+def backfill_merchant_keys(db: Session = Depends(get_db)):
+    """
+    Compute `merchant_key` for stored transactions that don't have one yet,
+    as a background job; poll it at `GET /jobs/{id}`. Also queued at startup
+    whenever such rows exist.
+    """
+    return jobs.enqueue_merchant_key_backfill(db)
+
+
 @router.get("/{transaction_id}", response_model=schemas.TransactionRead)
 def read_transaction(
         transaction_id: UUID,
@@ -90,6 +301,7 @@ def create_transaction(
         account_id=payload.account_id,
         category_id=payload.category_id,
         description=payload.description,
+        merchant_key=stored_merchant_key(payload.description),
         amount=payload.amount,
         date=payload.date,
         datetime=payload.datetime,
@@ -0,0 +1,126 @@
+"""
+Compiled matcher for auto-categorization rules (CategoryRule).
+
+All rule patterns go into one Aho-Corasick automaton, so matching a
+description costs one pass over its characters no matter how many rules
+exist; only the rules whose pattern occurs are then checked against their
+account and amount conditions. Patterns and descriptions are compared
+case-insensitively with runs of whitespace collapsed.
+"""
+from collections import deque
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+
+def normalize(text: Optional[str]) -> str:
+    return " ".join(text.lower().split()) if text else ""
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    rule_id: UUID
+    category_id: UUID
+    priority: int
+    account_id: Optional[UUID] = None
+    min_amount: Optional[Decimal] = None
+    max_amount: Optional[Decimal] = None
+
+    def accepts(self, account_id: Optional[UUID], amount: Optional[Decimal]) -> bool:
+        if self.account_id is not None and self.account_id != account_id:
+            return False
+        if self.min_amount is not None and (amount is None or amount < self.min_amount):
+            return False
+        if self.max_amount is not None and (amount is None or amount > self.max_amount):
+            return False
+        return True
+
+
+class RuleMatcher:
+    """
+    Built once per rule-set version from (pattern, CompiledRule) pairs.
+    match() returns the category of the best matching rule: lowest priority
+    first, then the order the rules were given in.
+    """
+
+    def __init__(self, rules: Iterable[Tuple[str, CompiledRule]]):
+        # Trie as parallel lists: goto[state] maps char -> state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Rule indexes whose pattern ends at this state (incl. via fail links)
+        self._out: List[List[int]] = [[]]
+        self._rules: List[CompiledRule] = []
+
+        for pattern, rule in rules:
+            pattern = normalize(pattern)
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(len(self._rules))
+            self._rules.append(rule)
+
+        self._build_fail_links()
+        # Best rule first, so the first accepted candidate wins
+        self._rank = {index: (rule.priority, index) for index, rule in enumerate(self._rules)}
+
+    def _build_fail_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def candidates(self, description: Optional[str]) -> List[int]:
+        """Indexes of the rules whose pattern occurs in description."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        for char in normalize(description):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return sorted(found, key=self._rank.__getitem__)
+
+    def match(
+            self,
+            description: Optional[str],
+            account_id: Optional[UUID] = None,
+            amount: Optional[Decimal] = None,
+            merchant_name: Optional[str] = None,
+    ) -> Optional[UUID]:
+        """
+        A rule's pattern may occur in the description or, for Plaid rows, in
+        the merchant_name Plaid derived from it (often the only readable
+        form of a cryptic card descriptor).
+        """
+        if not self._rules:
+            return None
+        candidates = self.candidates(description)
+        if merchant_name:
+            candidates = sorted(set(candidates).union(self.candidates(merchant_name)), key=self._rank.__getitem__)
+        for index in candidates:
+            rule = self._rules[index]
+            if rule.accepts(account_id, amount):
+                return rule.category_id
+        return None
@@ -1,7 +1,8 @@
 from uuid import UUID
 from pydantic import BaseModel, ConfigDict, condecimal, Field
+import datetime as dt
 from datetime import date, datetime
-from typing import Optional, List, Literal
+from typing import Optional, List, Literal, Dict, Any
 from decimal import Decimal
 
 DecimalAmount = condecimal(max_digits=10, decimal_places=2)
@@ -64,6 +65,47 @@ class CategoryGroupWithCategories(CategoryGroupRead):
     categories: List[CategoryRead]
 
 
+# --- Category Rule Schemas ---
+
+class CategoryRuleCreate(BaseModel):
+    pattern: str = Field(min_length=1)
+    category_id: UUID
+    account_id: Optional[UUID] = None
+    min_amount: Optional[DecimalAmount] = None
+    max_amount: Optional[DecimalAmount] = None
+    priority: int = 100
+    is_active: bool = True
+
+
+class CategoryRuleUpdate(BaseModel):
+    pattern: Optional[str] = Field(default=None, min_length=1)
+    category_id: Optional[UUID] = None
+    account_id: Optional[UUID] = None
+    min_amount: Optional[DecimalAmount] = None
+    max_amount: Optional[DecimalAmount] = None
+    priority: Optional[int] = None
+    is_active: Optional[bool] = None
+
+
+class CategoryRuleRead(BaseModel):
+    id: UUID
+    pattern: str
+    category_id: UUID
+    account_id: Optional[UUID] = None
+    min_amount: Optional[Decimal] = None
+    max_amount: Optional[Decimal] = None
+    priority: int
+    is_active: bool
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ApplyRulesRequest(BaseModel):
+    # False: only fill in uncategorized transactions; True: also re-categorize
+    overwrite: bool = False
+
+
 # --- Account Schemas ---
 
 class AccountCreate(BaseModel):
@@ -114,7 +156,7 @@ class TransactionCreate(BaseModel):
     description: str
     amount: DecimalAmount
     date: date
-    datetime: Optional[datetime] = None
+    datetime: Optional[dt.datetime] = None  # field name shadows the type inside the class
     pending: bool = False
     plaid_transaction_id: Optional[str] = None
 
@@ -130,9 +172,10 @@ class TransactionRead(BaseModel):
     account_id: UUID
     category_id: Optional[UUID] = None
     description: str
+    merchant_key: Optional[str] = None
     amount: DecimalAmount
     date: date
-    datetime: Optional[datetime] = None
+    datetime: Optional[dt.datetime] = None  # field name shadows the type inside the class
     pending: bool
     account: Optional[AccountRead] = None
 
@@ -143,11 +186,51 @@ class TransactionDetailRead(TransactionRead):
     pass
 
 
+class TransactionFilter(BaseModel):
+    """The list_transaction filters, for endpoints that act on a filtered set."""
+    account_id: Optional[UUID] = None
+    category_id: Optional[UUID] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    uncategorized: Optional[bool] = None
+    q: Optional[str] = None
+
+
+class TransactionBulkUpdateRequest(BaseModel):
+    """Applies `update` to the given ids, or to every row matching `filter`."""
+    update: TransactionUpdate
+    transaction_ids: Optional[List[UUID]] = None
+    filter: Optional[TransactionFilter] = None
+
+
+class TransactionBulkUpdateResponse(BaseModel):
+    updated: int
+
+
+class TransactionImportError(BaseModel):
+    row: int  # CSV line number, or OFX transaction number
+    error: str
+
+
+class TransactionImportResponse(BaseModel):
+    rows: int
+    imported: int
+    duplicates: int
+    failed: int
+    errors: List[TransactionImportError]  # first IMPORT_MAX_ERRORS failures
+
+
+TotalMode = Literal["exact", "estimate", "none"]
+TransactionSort = Literal["date", "relevance"]
+
+
 class TransactionListResponse(BaseModel):
     items: List[TransactionRead]
-    total: int
+    total: Optional[int] = None
+    total_is_estimate: bool = False
     limit: int
     offset: int
+    next_cursor: Optional[str] = None
 
 
 # --- Budget Schemas ---
@@ -182,6 +265,16 @@ class BudgetCategorySummary(BaseModel):
     actual: DecimalAmount
     remaining: DecimalAmount
     is_over_budget: bool
+    # Trailing averages of actual over the 3/6/12 months ending with this one
+    avg_actual_3m: Optional[DecimalAmount] = None
+    avg_actual_6m: Optional[DecimalAmount] = None
+    avg_actual_12m: Optional[DecimalAmount] = None
+    # January through this month
+    ytd_planned: Optional[DecimalAmount] = None
+    ytd_actual: Optional[DecimalAmount] = None
+    # Same month a year earlier; None when there is no data for it
+    last_year_actual: Optional[DecimalAmount] = None
+    change_vs_last_year: Optional[DecimalAmount] = None
 
 class BudgetGroupSummary(BaseModel):
     group_id: UUID
@@ -231,6 +324,19 @@ class DashboardSummaryResponse(BaseModel):
     accounts: List[DashboardAccountSummary]
     recent_transactions: List[TransactionDetailRead]
 
+class TrendCategorySeries(BaseModel):
+    category_id: UUID
+    group_id: UUID
+    name: str
+    type: str  # income, expense, transfer
+    # One entry per month of TrendResponse.months (0.00 for months without data)
+    planned: List[DecimalAmount]
+    actual: List[DecimalAmount]
+
+class TrendResponse(BaseModel):
+    months: List[str]  # YYYY-MM, oldest first
+    categories: List[TrendCategorySeries]
+
 class PlaidItemRead(BaseModel):
     id: UUID
     plaid_item_id: str
@@ -249,3 +355,41 @@ class PlaidPublicTokenRequest(BaseModel):
 class PlaidSyncRequest(BaseModel):
     plaid_item_id: Optional[str] = None
     item_id: Optional[UUID] = None
+
+
+class PlaidWebhookRequest(BaseModel):
+    webhook_type: str
+    webhook_code: str
+    item_id: Optional[str] = None
+
+    # Plaid sends extra, code-specific fields (new_transactions, error, environment, ...)
+    model_config = ConfigDict(extra="allow")
+
+
+# --- Background Job Schemas ---
+
+JobStatus = Literal["queued", "running", "succeeded", "failed"]
+
+
+class JobRead(BaseModel):
+    id: UUID
+    kind: str
+    status: JobStatus
+    item_id: Optional[UUID] = None
+
+    pages_fetched: int
+    rows_applied: int
+    cursor: Optional[str] = None
+
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PlaidSyncAllResponse(BaseModel):
+    jobs: List[JobRead]  # one queued or already running plaid_sync job per item
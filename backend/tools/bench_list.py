@@ -0,0 +1,82 @@
+"""
+Transaction list response-time benchmark.
+
+Compares GET /transactions/ (column projection serialized straight to JSON)
+with the previous path, mounted here as GET /bench/orm: full ORM objects with
+joinedload(Transaction.account), validated and serialized by FastAPI through
+response_model=TransactionListResponse. Both run in-process against the
+configured Postgres database (POSTGRES_* env vars), on the same page.
+
+    python -m backend.tools.bench_list --limit 200 --requests 200
+"""
+import argparse
+import statistics
+import time
+from typing import Callable, Dict, List
+
+
+def _time_requests(call: Callable[[], object], requests: int, warmup: int) -> List[float]:
+    for _ in range(warmup):
+        call()
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def _summary(name: str, timings: List[float]) -> Dict[str, object]:
+    ordered = sorted(timings)
+    return {
+        "path": name,
+        "mean": statistics.mean(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark GET /transactions/ serialization paths")
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--offset", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    args = parser.parse_args()
+
+    from fastapi import Depends
+    from fastapi.testclient import TestClient
+    from sqlalchemy.orm import Session
+
+    from backend import schemas
+    from backend.crud import transaction as crud_transaction
+    from backend.database import get_db
+    from backend.main import app
+
+    @app.get("/bench/orm", response_model=schemas.TransactionListResponse, include_in_schema=False)
+    def list_transactions_orm(limit: int = 50, offset: int = 0, db: Session = Depends(get_db)):
+        return crud_transaction.list_transaction(db=db, limit=limit, offset=offset)
+
+    client = TestClient(app)
+    params = {"limit": args.limit, "offset": args.offset}
+
+    projected = client.get("/transactions/", params=params)
+    orm = client.get("/bench/orm", params=params)
+    if projected.json() != orm.json():
+        raise SystemExit("responses differ between the projection and ORM paths")
+    rows = len(projected.json()["items"])
+
+    results = [
+        _summary("orm + response_model", _time_requests(lambda: client.get("/bench/orm", params=params), args.requests, args.warmup)),
+        _summary("projection", _time_requests(lambda: client.get("/transactions/", params=params), args.requests, args.warmup)),
+    ]
+
+    print(f"GET /transactions/ limit={args.limit}: {rows} rows, {len(projected.content)} bytes, {args.requests} requests")
+    print(f"{'path':<22} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for r in results:
+        print(f"{r['path']:<22} {r['mean']:>9.2f} {r['p50']:>9.2f} {r['p95']:>9.2f}")
+    print(f"speedup (mean): {results[0]['mean'] / results[1]['mean']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Plaid sync throughput benchmark.
+
+Starts backend/tools/fake_plaid.py in a subprocess, links a fake item into
+the configured Postgres database (POSTGRES_* env vars) and measures an initial
+full-history sync and an incremental sync after modify / remove / add churn.
+
+Reports rows/sec, DB round trips (statements + commits) and the process peak
+RSS after each phase. The benchmark item, its accounts and transactions are
+deleted afterwards unless --keep is given.
+
+    python -m backend.tools.bench_sync --transactions 20000 --churn-modified 500
+"""
+import argparse
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"fake Plaid server did not come up at {url}")
+
+
+def _post(url: str, body: dict) -> dict:
+    req = urllib.request.Request(url, data=json.dumps(body).encode(), headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req) as resp:
+        return json.loads(resp.read())
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark Plaid transaction sync against a local fake Plaid")
+    parser.add_argument("--accounts", type=int, default=3)
+    parser.add_argument("--transactions", type=int, default=20000)
+    parser.add_argument("--churn-added", type=int, default=200)
+    parser.add_argument("--churn-modified", type=int, default=500)
+    parser.add_argument("--churn-removed", type=int, default=100)
+    parser.add_argument("--mutation-rate", type=float, default=0.0)
+    parser.add_argument("--prefetch-pages", type=int, default=None,
+                        help="override PLAID_SYNC_PREFETCH_PAGES (0 = serial)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="keep the benchmark rows in the database")
+    args = parser.parse_args()
+
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen([
+        sys.executable, "-m", "backend.tools.fake_plaid",
+        "--port", str(port),
+        "--accounts", str(args.accounts),
+        "--transactions", str(args.transactions),
+        "--mutation-rate", str(args.mutation_rate),
+        "--seed", str(args.seed),
+    ])
+
+    # Must be set before the backend modules read their configuration
+    os.environ["PLAID_BASE_URL"] = base_url
+    os.environ.setdefault("PLAID_CLIENT_ID", "fake-client-id")
+    os.environ.setdefault("PLAID_SECRET", "fake-secret")
+    if args.prefetch_pages is not None:
+        os.environ["PLAID_SYNC_PREFETCH_PAGES"] = str(args.prefetch_pages)
+
+    from sqlalchemy import event
+
+    from backend import models
+    from backend.database import engine, SessionLocal
+    from backend.crud import plaid as crud_plaid
+    from backend.plaid_client import client
+    from plaid.model.item_public_token_exchange_request import ItemPublicTokenExchangeRequest
+
+    counters = {"statements": 0, "commits": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_statement(*_):
+        counters["statements"] += 1
+
+    @event.listens_for(engine, "commit")
+    def count_commit(*_):
+        counters["commits"] += 1
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    plaid_item = None
+
+    try:
+        _wait_for(f"{base_url}/health")
+
+        exchange = client.item_public_token_exchange(ItemPublicTokenExchangeRequest(public_token="public-fake"))
+        plaid_item = crud_plaid.get_plaid_item_by_plaid_item_id(db, exchange.item_id)
+        if plaid_item is None:
+            plaid_item = crud_plaid.create_plaid_item(db, exchange.item_id, exchange.access_token)
+        elif plaid_item.transactions_cursor:
+            raise SystemExit(f"item {exchange.item_id} already synced; rerun with a different --seed or without --keep")
+
+        def run_phase(name: str) -> dict:
+            db.expire_all()
+            counters["statements"] = counters["commits"] = 0
+            started = time.perf_counter()
+            result = crud_plaid.sync_item(db, client, crud_plaid.get_plaid_item_by_id(db, plaid_item.id))
+            elapsed = time.perf_counter() - started
+            rows = result["added"] + result["modified"] + result["removed"]
+            return {
+                "phase": name,
+                "rows": rows,
+                "seconds": elapsed,
+                "rows_per_sec": rows / elapsed if elapsed else 0.0,
+                "statements": counters["statements"],
+                "commits": counters["commits"],
+                "round_trips": counters["statements"] + counters["commits"],
+                "peak_rss_mb": _peak_rss_mb(),
+            }
+
+        results = [run_phase("initial")]
+        _post(f"{base_url}/sandbox/churn", {
+            "added": args.churn_added,
+            "modified": args.churn_modified,
+            "removed": args.churn_removed,
+        })
+        results.append(run_phase("incremental"))
+
+        print(f"{'phase':<12} {'rows':>8} {'seconds':>9} {'rows/sec':>10} {'stmts':>7} {'commits':>8} {'round trips':>12} {'peak RSS MB':>12}")
+        for r in results:
+            print(
+                f"{r['phase']:<12} {r['rows']:>8} {r['seconds']:>9.2f} {r['rows_per_sec']:>10.0f} "
+                f"{r['statements']:>7} {r['commits']:>8} {r['round_trips']:>12} {r['peak_rss_mb']:>12.1f}"
+            )
+    finally:
+        if plaid_item is not None and not args.keep:
+            db.rollback()
+            account_ids = [a.id for a in crud_plaid.list_accounts_by_item(db, plaid_item.id)]
+            db.query(models.Transaction).filter(models.Transaction.account_id.in_(account_ids)).delete(synchronize_session=False)
+            db.query(models.Account).filter(models.Account.id.in_(account_ids)).delete(synchronize_session=False)
+            db.query(models.PlaidItem).filter(models.PlaidItem.id == plaid_item.id).delete(synchronize_session=False)
+            db.commit()
+        db.close()
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+EXPLAIN the transaction queries behind each read endpoint.
+
+Calls the real endpoints in-process against the configured Postgres database
+(POSTGRES_* env vars), captures every SELECT they send that touches the
+transactions table and prints its plan together with the transactions
+indexes it uses. A query that still scans transactions sequentially is
+flagged.
+
+    python -m backend.tools.explain_queries
+    python -m backend.tools.explain_queries --analyze --no-seqscan
+
+On a small development database the planner rightly prefers a seq scan;
+--no-seqscan (enable_seqscan = off) shows whether an index *can* serve the
+query.
+"""
+import argparse
+import re
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import event
+
+ENDPOINTS: List[Tuple[str, str, Dict[str, Any]]] = [
+    # (label, path, query params); "{account_id}" / "{category_id}" are filled from the database
+    ("list: newest first", "/transactions/", {}),
+    ("list: date range", "/transactions/", {"start_date": "{month_start}", "end_date": "{month_end}"}),
+    ("list: account register", "/transactions/", {"account_id": "{account_id}"}),
+    ("list: category", "/transactions/", {"category_id": "{category_id}"}),
+    ("list: uncategorized inbox", "/transactions/", {"uncategorized": "true"}),
+    ("list: search", "/transactions/", {"q": "amzn"}),
+    ("summary: budget", "/summary/budget", {"month": "{month}"}),
+    ("summary: dashboard", "/summary/dashboard", {"month": "{month}"}),
+]
+
+_TRANSACTIONS = re.compile(r"\bFROM transactions\b", re.IGNORECASE)
+_INDEX = re.compile(r"\b(?:Index|Index Only|Bitmap Index) Scan(?: Backward)? (?:using|on) (\w+)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="EXPLAIN the transaction queries behind each read endpoint")
+    parser.add_argument("--analyze", action="store_true", help="EXPLAIN ANALYZE (runs the queries)")
+    parser.add_argument("--no-seqscan", action="store_true", help="SET enable_seqscan = off while explaining")
+    args = parser.parse_args()
+
+    from datetime import date
+
+    from fastapi.testclient import TestClient
+
+    from backend import models
+    from backend.database import engine, SessionLocal
+    from backend.main import app
+
+    db = SessionLocal()
+    try:
+        latest = db.query(models.Transaction).order_by(models.Transaction.date.desc()).first()
+        month = latest.date if latest else date.today()
+        account_id = latest.account_id if latest else None
+        category = db.query(models.Transaction.category_id).filter(models.Transaction.category_id.isnot(None)).first()
+    finally:
+        db.close()
+
+    month_start = month.replace(day=1)
+    values = {
+        "month": month_start.strftime("%Y-%m"),
+        "month_start": month_start.isoformat(),
+        "month_end": month.isoformat(),
+        "account_id": str(account_id) if account_id else None,
+        "category_id": str(category[0]) if category else None,
+    }
+
+    captured: List[Tuple[str, Any]] = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and _TRANSACTIONS.search(statement):
+            captured.append((statement, parameters))
+
+    client = TestClient(app)
+    options = "ANALYZE, BUFFERS" if args.analyze else "COSTS"
+    flagged = 0
+
+    for label, path, params in ENDPOINTS:
+        try:
+            filled = {k: v.format(**values) if isinstance(v, str) else v for k, v in params.items()}
+        except (KeyError, AttributeError):
+            filled = None
+        if filled is None or any(v == "None" for v in filled.values()):
+            print(f"== {label}: skipped (no matching data)\n")
+            continue
+
+        captured.clear()
+        resp = client.get(path, params=filled)
+        print(f"== {label}: GET {path} {filled} -> {resp.status_code}")
+        statements = list(captured)
+
+        raw = engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            if args.no_seqscan:
+                cursor.execute("SET enable_seqscan = off")
+            for statement, parameters in statements:
+                cursor.execute(f"EXPLAIN ({options}) {statement}", parameters)
+                plan = "\n".join(row[0] for row in cursor.fetchall())
+                indexes = sorted(set(i for i in _INDEX.findall(plan) if i.startswith("ix_transactions") or i == "transactions_pkey"))
+                seq_scan = "Seq Scan on transactions" in plan
+                flagged += seq_scan
+                print(f"-- indexes: {', '.join(indexes) or 'none'}{'   <-- SEQ SCAN on transactions' if seq_scan else ''}")
+                print(plan)
+                print()
+            raw.rollback()
+        finally:
+            raw.close()
+
+    print(f"{flagged} quer{'y' if flagged == 1 else 'ies'} scanning transactions sequentially")
+
+
+if __name__ == "__main__":
+    main()
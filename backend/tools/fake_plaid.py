@@ -0,0 +1,306 @@
+"""
+Local stand-in for the Plaid API, for benchmarks and offline development.
+
+Implements just enough of /link/token/create, /item/public_token/exchange,
+/accounts/get and /transactions/sync for the SDK and our raw sync calls,
+backed by a generated fixture: N accounts, M transactions and a change log
+that /sandbox/churn extends with modify / remove / add events.
+
+Run it with:
+    python -m backend.tools.fake_plaid --accounts 3 --transactions 20000 --port 8765
+and point the backend at it with PLAID_BASE_URL=http://127.0.0.1:8765
+"""
+import argparse
+import base64
+import random
+import threading
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+MERCHANTS = [
+    ("SQ *BLUE BOTTLE COFFEE {n} SEATTLE WA", "Blue Bottle Coffee"),
+    ("AMZN Mktp US*{code}", "Amazon"),
+    ("AMAZON.COM*{code} AMZN.COM/BILL WA", "Amazon"),
+    ("TST* MOD PIZZA {n}", "MOD Pizza"),
+    ("SAFEWAY #{n} SEATTLE WA", "Safeway"),
+    ("UBER *TRIP {code} HELP.UBER.COM CA", "Uber"),
+    ("SHELL OIL {n} SEATTLE WA", "Shell"),
+    ("NETFLIX.COM {n} CA", "Netflix"),
+    ("PAYPAL *SPOTIFY {n} 402-935-7733 CA", "Spotify"),
+    ("COSTCO WHSE #{n} ISSAQUAH WA", "Costco"),
+    ("ACH DEPOSIT PAYROLL {code}", None),
+    ("ONLINE TRANSFER TO SAV {n}", None),
+]
+
+ACCOUNT_TYPES = [
+    ("depository", "checking", "Plaid Checking"),
+    ("depository", "savings", "Plaid Saving"),
+    ("credit", "credit card", "Plaid Credit Card"),
+]
+
+
+def _encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(f"fake:{offset}".encode()).decode()
+
+
+def _decode_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    return int(base64.urlsafe_b64decode(cursor.encode()).decode().split(":", 1)[1])
+
+
+class PlaidError(Exception):
+    def __init__(self, error_code: str, error_message: str, error_type: str = "INVALID_INPUT", status: int = 400):
+        self.error_code = error_code
+        self.error_message = error_message
+        self.error_type = error_type
+        self.status = status
+
+
+class FakePlaidFixture:
+    """
+    Deterministic fake institution: one item, `accounts` accounts and a change
+    log that starts with `transactions` 'added' events. A cursor is an offset
+    into the change log, so every churn round shows up as new sync pages.
+    """
+
+    def __init__(
+            self,
+            accounts: int = 3,
+            transactions: int = 5000,
+            days: int = 730,
+            seed: int = 42,
+            mutation_rate: float = 0.0,
+    ):
+        self.rng = random.Random(seed)
+        self.days = days
+        self.mutation_rate = mutation_rate
+        self.lock = threading.Lock()
+
+        self.item_id = f"fake-item-{seed}"
+        self.access_token = f"access-fake-{seed}"
+
+        self.accounts: List[Dict[str, Any]] = []
+        for i in range(accounts):
+            acct_type, subtype, name = ACCOUNT_TYPES[i % len(ACCOUNT_TYPES)]
+            self.accounts.append({
+                "account_id": f"fake-acct-{seed}-{i}",
+                "balances": {
+                    "available": round(self.rng.uniform(100, 10000), 2),
+                    "current": round(self.rng.uniform(100, 10000), 2),
+                    "limit": 5000.0 if acct_type == "credit" else None,
+                    "iso_currency_code": "USD",
+                    "unofficial_currency_code": None,
+                },
+                "mask": f"{i:04d}",
+                "name": f"{name} {i}",
+                "official_name": f"{name} {i}",
+                "type": acct_type,
+                "subtype": subtype,
+            })
+
+        self.transactions: Dict[str, Dict[str, Any]] = {}
+        self.log: List[tuple] = []  # ("added" | "modified" | "removed", payload)
+        self.churn(added=transactions)
+
+    # --- fixture generation ---
+
+    def _new_transaction(self) -> Dict[str, Any]:
+        template, merchant_name = self.rng.choice(MERCHANTS)
+        name = template.format(n=self.rng.randint(100, 9999), code=uuid.UUID(int=self.rng.getrandbits(128)).hex[:8].upper())
+        tx_date = date.today() - timedelta(days=self.rng.randint(0, self.days))
+        amount = round(self.rng.uniform(-2500, 250) if merchant_name is None else self.rng.uniform(1, 250), 2)
+        return {
+            "transaction_id": uuid.UUID(int=self.rng.getrandbits(128)).hex,
+            "account_id": self.rng.choice(self.accounts)["account_id"],
+            "amount": amount,
+            "iso_currency_code": "USD",
+            "unofficial_currency_code": None,
+            "name": name,
+            "merchant_name": merchant_name,
+            "date": tx_date.isoformat(),
+            "authorized_date": tx_date.isoformat(),
+            "datetime": None,
+            "pending": False,
+            "pending_transaction_id": None,
+            "payment_channel": "in store",
+            "transaction_type": "place",
+        }
+
+    def churn(self, added: int = 0, modified: int = 0, removed: int = 0) -> Dict[str, int]:
+        """Appends modify / remove / add events to the change log."""
+        with self.lock:
+            existing = list(self.transactions)
+            self.rng.shuffle(existing)
+            modified = min(modified, len(existing))
+            removed = min(removed, len(existing) - modified)
+
+            for tx_id in existing[:modified]:
+                tx = dict(self.transactions[tx_id])
+                tx["amount"] = round(tx["amount"] * self.rng.uniform(0.8, 1.2), 2)
+                tx["pending"] = False
+                self.transactions[tx_id] = tx
+                self.log.append(("modified", tx))
+
+            for tx_id in existing[modified:modified + removed]:
+                del self.transactions[tx_id]
+                self.log.append(("removed", {"transaction_id": tx_id, "account_id": None}))
+
+            for _ in range(added):
+                tx = self._new_transaction()
+                self.transactions[tx["transaction_id"]] = tx
+                self.log.append(("added", tx))
+
+            for acct in self.accounts:
+                acct["balances"]["current"] = round(acct["balances"]["current"] + self.rng.uniform(-100, 100), 2)
+
+            return {"added": added, "modified": modified, "removed": removed, "log_size": len(self.log)}
+
+    # --- API ---
+
+    def check_access_token(self, access_token: Optional[str]) -> None:
+        if access_token != self.access_token:
+            raise PlaidError("INVALID_ACCESS_TOKEN", "provided access token is in an invalid format")
+
+    def sync(self, cursor: Optional[str], count: int) -> Dict[str, Any]:
+        offset = _decode_cursor(cursor)
+        count = max(1, min(count, 500))
+
+        if offset and self.mutation_rate and self.rng.random() < self.mutation_rate:
+            raise PlaidError(
+                "TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION",
+                "Underlying transaction data changed since last page was fetched. Please restart pagination from last update.",
+                error_type="TRANSACTIONS_ERROR",
+            )
+
+        with self.lock:
+            events = self.log[offset:offset + count]
+            next_offset = offset + len(events)
+            has_more = next_offset < len(self.log)
+
+        page: Dict[str, List[Dict[str, Any]]] = {"added": [], "modified": [], "removed": []}
+        for kind, payload in events:
+            page[kind].append(payload)
+
+        return {
+            **page,
+            "accounts": [],
+            "next_cursor": _encode_cursor(next_offset),
+            "has_more": has_more,
+            "transactions_update_status": "HISTORICAL_UPDATE_COMPLETE",
+        }
+
+    def item(self) -> Dict[str, Any]:
+        return {
+            "item_id": self.item_id,
+            "institution_id": "ins_fake",
+            "webhook": None,
+            "error": None,
+            "available_products": [],
+            "billed_products": ["transactions"],
+            "products": ["transactions"],
+            "consent_expiration_time": None,
+            "update_type": "background",
+        }
+
+
+def create_app(fixture: FakePlaidFixture) -> FastAPI:
+    app = FastAPI(title="Fake Plaid")
+
+    def error_response(e: PlaidError) -> JSONResponse:
+        return JSONResponse(
+            status_code=e.status,
+            content={
+                "error_type": e.error_type,
+                "error_code": e.error_code,
+                "error_message": e.error_message,
+                "display_message": None,
+                "request_id": uuid.uuid4().hex,
+            },
+        )
+
+    @app.exception_handler(PlaidError)
+    async def plaid_error_handler(request: Request, e: PlaidError):
+        return error_response(e)
+
+    @app.post("/link/token/create")
+    async def link_token_create(request: Request):
+        return {
+            "link_token": f"link-fake-{uuid.uuid4()}",
+            "expiration": (datetime.now(timezone.utc) + timedelta(hours=4)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "request_id": uuid.uuid4().hex,
+        }
+
+    @app.post("/item/public_token/exchange")
+    async def item_public_token_exchange(request: Request):
+        return {
+            "access_token": fixture.access_token,
+            "item_id": fixture.item_id,
+            "request_id": uuid.uuid4().hex,
+        }
+
+    @app.post("/accounts/get")
+    async def accounts_get(request: Request):
+        body = await request.json()
+        fixture.check_access_token(body.get("access_token"))
+        return {
+            "accounts": fixture.accounts,
+            "item": fixture.item(),
+            "request_id": uuid.uuid4().hex,
+        }
+
+    @app.post("/transactions/sync")
+    async def transactions_sync(request: Request):
+        body = await request.json()
+        fixture.check_access_token(body.get("access_token"))
+        page = fixture.sync(body.get("cursor"), int(body.get("count", 100)))
+        return {**page, "request_id": uuid.uuid4().hex}
+
+    # --- test-only controls ---
+
+    @app.post("/sandbox/churn")
+    async def sandbox_churn(request: Request):
+        body = await request.json()
+        return fixture.churn(
+            added=int(body.get("added", 0)),
+            modified=int(body.get("modified", 0)),
+            removed=int(body.get("removed", 0)),
+        )
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "log_size": len(fixture.log)}
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a local fake Plaid API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--accounts", type=int, default=3)
+    parser.add_argument("--transactions", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mutation-rate", type=float, default=0.0,
+                        help="probability that a non-first sync page fails with TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION")
+    args = parser.parse_args()
+
+    fixture = FakePlaidFixture(
+        accounts=args.accounts,
+        transactions=args.transactions,
+        days=args.days,
+        seed=args.seed,
+        mutation_rate=args.mutation_rate,
+    )
+    uvicorn.run(create_app(fixture), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Regenerate the category_month_totals aggregate from transactions.
+
+The table is kept current by triggers on transactions (see migrations.py);
+this is for repairs, e.g. after restoring transactions from a dump with
+triggers disabled. --check only reports the (category, month) rows that
+differ from a full recomputation, without writing.
+
+    python -m backend.tools.rebuild_summaries [--check]
+"""
+import argparse
+
+from sqlalchemy import text
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild category_month_totals")
+    parser.add_argument("--check", action="store_true", help="compare with transactions instead of rebuilding")
+    args = parser.parse_args()
+
+    from backend import models
+    from backend.crud import summary as crud_summary
+    from backend.database import SessionLocal, engine
+    from backend.migrations import run_migrations
+
+    models.Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    db = SessionLocal()
+    try:
+        if not args.check:
+            result = crud_summary.rebuild_category_month_totals(db)
+            print(f"category_month_totals rebuilt: {result['rows']} rows")
+            return
+
+        # Zeroed aggregate rows are equivalent to missing ones
+        mismatches = db.execute(text(f"""
+            SELECT coalesce(a.category_id, e.category_id) AS category_id,
+                   coalesce(a.month, e.month) AS month,
+                   a.total AS stored_total, e.total AS expected_total,
+                   a.transaction_count AS stored_count, e.transaction_count AS expected_count
+            FROM (SELECT * FROM category_month_totals WHERE transaction_count <> 0 OR total <> 0) AS a
+            FULL JOIN ({crud_summary.CATEGORY_MONTH_TOTALS_SELECT}) AS e
+              ON e.category_id = a.category_id AND e.month = a.month
+            WHERE a.total IS DISTINCT FROM e.total
+               OR a.transaction_count IS DISTINCT FROM e.transaction_count
+            ORDER BY 2, 1
+        """)).all()
+        for row in mismatches:
+            print(
+                f"{row.month:%Y-%m} {row.category_id}: "
+                f"stored {row.stored_total} ({row.stored_count}), expected {row.expected_total} ({row.expected_count})"
+            )
+        print(f"{len(mismatches)} mismatched rows")
+        if mismatches:
+            raise SystemExit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()